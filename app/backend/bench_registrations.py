@@ -0,0 +1,67 @@
+"""Sustained registration throughput with and without group commit
+
+Creates a throwaway event, then keeps --concurrency registrations in flight
+for --duration seconds, once with plain per-request upserts and once through
+the RegistrationWriteBuffer, and prints registrations/second for each. Needs
+the same MONGO_URL / DB_NAME environment as the API; the bench event and its
+registrations are removed afterwards.
+
+    python bench_registrations.py --concurrency 200 --duration 10
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import server
+
+
+async def run(event_id: str, concurrency: int, duration: float) -> int:
+    done = 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal done
+        while time.perf_counter() < deadline:
+            reg = server.EventRegistrationCreate(
+                eventId=event_id,
+                fullName="Bench",
+                email=f"{uuid.uuid4().hex}@bench.local",
+                phone="0",
+            )
+            await server.save_registration(event_id, reg, reg.email)
+            done += 1
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return done
+
+
+async def main(args):
+    async with server.lifespan(server.app):
+        event_id = f"bench-{uuid.uuid4()}"
+        await server.db.events.insert_one({"id": event_id, "slug": event_id, "title": "Bench", "date": ""})
+        try:
+            for mode in ("direct", "batched"):
+                server.registration_buffer = (
+                    server.RegistrationWriteBuffer(args.batch_size, args.batch_delay_ms / 1000)
+                    if mode == "batched" else None
+                )
+                started = time.perf_counter()
+                done = await run(event_id, args.concurrency, args.duration)
+                if server.registration_buffer:
+                    await server.registration_buffer.close()
+                elapsed = time.perf_counter() - started
+                print(f"{mode:>8}: {done / elapsed:10.0f} registrations/s ({done} in {elapsed:.1f}s)")
+        finally:
+            server.registration_buffer = None
+            await server.db.registrations.delete_many({"eventId": event_id})
+            await server.db.events.delete_one({"id": event_id})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark registration writes")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--batch-size", type=int, default=server.REGISTRATION_BATCH_SIZE)
+    parser.add_argument("--batch-delay-ms", type=float, default=server.REGISTRATION_BATCH_DELAY_MS)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,81 @@
+"""Cold-start budget check for the API
+
+Measures, over several fresh interpreter runs:
+  * import time of the server module
+  * time from spawning uvicorn to the first successful response from /api/
+
+and exits non-zero when the median of either exceeds its budget, so it can
+run as a regression check in CI. The server lifespan still connects to
+MONGO_URL, so point it at a reachable MongoDB for realistic numbers.
+
+    python bench_startup.py --runs 5 --import-budget-ms 300 --first-response-budget-ms 1500
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import server; print(time.perf_counter() - t)"
+
+
+def measure_import(env) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=HERE, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_first_response(env, port: int, timeout: float = 30) -> float:
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=HERE, env=env,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("Server did not answer within %ss" % timeout)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API import time and time-to-first-response")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8092)
+    parser.add_argument("--import-budget-ms", type=float, default=float(os.environ.get("IMPORT_BUDGET_MS", "300")))
+    parser.add_argument("--first-response-budget-ms", type=float, default=float(os.environ.get("FIRST_RESPONSE_BUDGET_MS", "1500")))
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+    imports = [measure_import(env) * 1000 for _ in range(args.runs)]
+    first_responses = [measure_first_response(env, args.port) * 1000 for _ in range(args.runs)]
+
+    failed = False
+    for name, samples, budget in (
+        ("import", imports, args.import_budget_ms),
+        ("first response", first_responses, args.first_response_budget_ms),
+    ):
+        median = statistics.median(samples)
+        over = median > budget
+        failed = failed or over
+        print(f"{name:>15}: median {median:7.1f} ms  min {min(samples):7.1f} ms  "
+              f"budget {budget:7.1f} ms  {'OVER BUDGET' if over else 'ok'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Throughput benchmark for the production launcher
+
+Starts run.py with 1, 2, 4 and 8 workers in turn, hammers one endpoint with
+keep-alive connections for a fixed duration and prints requests/second and
+latency percentiles for each worker count. Counts the launcher would not
+honour (STORAGE_ENGINE=memory, the single-process demo backend) are skipped,
+so every row is labelled with the workers that actually ran.
+
+    python bench_workers.py --path /api/articles --connections 64 --duration 10
+    python bench_workers.py --app-dir ../../backend --path /api/health --workers 1
+"""
+import argparse
+import asyncio
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+async def worker(host, port, request, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            status = int(headers.split(b" ", 2)[1])
+            for line in headers.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            if status >= 400:
+                errors.append(status)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+
+async def load(host, port, path, connections, duration):
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode()
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(
+        worker(host, port, request, deadline, latencies, errors) for _ in range(connections)
+    ))
+    return latencies, errors
+
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server did not start on {host}:{port}")
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def load_launcher(path: Path):
+    spec = importlib.util.spec_from_file_location("launcher", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare API throughput across worker counts")
+    parser.add_argument("--app-dir", default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8091)
+    parser.add_argument("--path", default="/api/")
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    args = parser.parse_args()
+
+    launcher = Path(args.app_dir) / "run.py"
+    worker_count = load_launcher(launcher).worker_count
+    counts = []
+    for requested in [int(w) for w in args.workers.split(",")]:
+        workers = worker_count(requested)
+        if workers != requested:
+            print(f"{launcher} runs {workers} worker(s) when asked for {requested}, skipping {requested}")
+        if workers not in counts:
+            counts.append(workers)
+
+    print(f"{'workers':>8} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for workers in counts:
+        server = subprocess.Popen(
+            [sys.executable, str(launcher), "--host", args.host, "--port", str(args.port),
+             "--workers", str(workers), "--log-level", "warning"],
+        )
+        try:
+            wait_for_port(args.host, args.port)
+            asyncio.run(load(args.host, args.port, args.path, args.connections, args.warmup))
+            latencies, errors = asyncio.run(
+                load(args.host, args.port, args.path, args.connections, args.duration)
+            )
+            print(f"{workers:>8} {len(latencies) / args.duration:>10.0f} "
+                  f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 99) * 1000:>8.1f} "
+                  f"{len(errors):>7}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
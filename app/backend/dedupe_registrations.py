@@ -0,0 +1,29 @@
+"""One-off cleanup before the unique (eventId, email) registration index
+
+Lowercases and trims stored registration emails, then keeps the earliest
+registration of every repeated (eventId, email) pair. Removed rows are
+copied to the registration_duplicates collection first. Finally builds the
+indexes, which the API refuses to start without. Safe to run more than once.
+
+    python dedupe_registrations.py
+"""
+import asyncio
+
+import server
+
+
+async def main():
+    # Not server.lifespan: it stops at the very index this script makes buildable
+    server.client = server.create_client()
+    server.db = server.client[server.DB_NAME]
+    try:
+        result = await server.dedupe_registrations()
+        await server.ensure_indexes()
+    finally:
+        server.client.close()
+    print(f"normalized emails: {result['normalized']}")
+    print(f"removed duplicates: {result['removed']} (copied to registration_duplicates)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
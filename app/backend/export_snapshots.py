@@ -0,0 +1,30 @@
+"""Full export of the public API as static JSON snapshots
+
+Writes every public endpoint to SNAPSHOT_DIR (or --dir) so nginx or a CDN can
+serve read traffic without reaching the API. Admin writes keep the files up
+to date incrementally afterwards; run this once after enabling snapshots or
+to rebuild the directory from scratch.
+
+    SNAPSHOT_DIR=/var/www/snapshots python export_snapshots.py
+"""
+import argparse
+import asyncio
+import os
+
+
+async def main(directory: str):
+    os.environ["SNAPSHOT_DIR"] = directory
+    import server
+
+    async with server.lifespan(server.app):
+        files = await server.export_all_snapshots()
+    print(f"Exported {files} snapshot files to {directory}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export public API snapshots")
+    parser.add_argument("--dir", default=os.environ.get("SNAPSHOT_DIR", ""))
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error("set SNAPSHOT_DIR or pass --dir")
+    asyncio.run(main(args.dir))
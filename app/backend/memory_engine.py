@@ -0,0 +1,1010 @@
+"""In-process storage engine
+
+Implements the part of the Motor collection API that server.py uses, so the
+whole API can run (and be benchmarked) without a MongoDB server:
+
+    find(filter, projection).sort(...).skip(n).limit(n).to_list(n) / async for
+    find_one, count_documents, aggregate ($match, $unwind, $group, $sort, $skip, $limit, $project)
+    insert_one, insert_many, update_one, update_many, bulk_write (UpdateOne, InsertOne, DeleteOne)
+    find_one_and_update, find_one_and_delete, delete_one, delete_many, create_index(es)
+
+Updates support $set, $setOnInsert, $unset, $inc, $push, array filters ($[name])
+and the aggregation-pipeline form with the expression operators the page
+routes use. Documents are kept in dicts in insertion order. Indexes are hash
+maps on their leading field (multikey for arrays) and unique indexes reject
+duplicates with pymongo's DuplicateKeyError, so handlers need no special cases.
+
+Everything runs on the event loop without awaiting mid-operation, which makes
+each call atomic the way a single-document Mongo write is. Data lives in this
+process only: run one worker, and set MEMORY_ENGINE_FILE to keep it across restarts.
+
+    STORAGE_ENGINE=memory python run.py --workers 1
+"""
+import copy
+import logging
+import operator
+import os
+import pickle
+import uuid
+from datetime import datetime, timedelta, timezone
+from itertools import product
+from types import SimpleNamespace
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+# ==================== FIELD PATHS ====================
+
+def resolve(value, parts):
+    """Values reached by a dotted path, descending into arrays like a Mongo query does"""
+    if not parts:
+        return [value]
+    head, rest = parts[0], parts[1:]
+    if isinstance(value, dict):
+        return resolve(value[head], rest) if head in value else []
+    if isinstance(value, list):
+        if head.isdigit():
+            index = int(head)
+            return resolve(value[index], rest) if index < len(value) else []
+        found = []
+        for item in value:
+            if isinstance(item, dict):
+                found.extend(resolve(item, parts))
+        return found
+    return []
+
+def expand(values):
+    """Arrays match on themselves and on each of their elements"""
+    expanded = []
+    for value in values:
+        expanded.append(value)
+        if isinstance(value, list):
+            expanded.extend(value)
+    return expanded
+
+def freeze(value):
+    """Hashable stand-in for index keys"""
+    if isinstance(value, dict):
+        return ("__dict__", tuple((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return ("__list__", tuple(freeze(v) for v in value))
+    return value
+
+def bson_copy(value):
+    """Deep copy as a Mongo round trip would return it: dates in UTC, truncated to milliseconds"""
+    if isinstance(value, dict):
+        return {key: bson_copy(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [bson_copy(item) for item in value]
+    if isinstance(value, datetime):
+        value = value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+# ==================== QUERY MATCHING ====================
+
+def equals_any(values, target):
+    if target is None:
+        return not values or any(v is None for v in expand(values))
+    return any(v == target for v in expand(values))
+
+def compare_any(values, target, compare):
+    for value in expand(values):
+        if value is None or isinstance(value, (dict, list)):
+            continue
+        try:
+            if compare(value, target):
+                return True
+        except TypeError:
+            continue
+    return False
+
+TYPE_NAMES = {
+    "string": str,
+    "date": datetime,
+    "array": list,
+    "object": dict,
+    "bool": bool,
+    "number": (int, float),
+    "int": int,
+    "double": float,
+}
+
+def is_type(value, name):
+    if name == "null":
+        return value is None
+    if name in ("number", "int", "double") and isinstance(value, bool):
+        return False
+    return isinstance(value, TYPE_NAMES[name])
+
+def match_operator(values, op, arg):
+    if op == "$in":
+        return any(equals_any(values, target) for target in arg)
+    if op == "$nin":
+        return not any(equals_any(values, target) for target in arg)
+    if op == "$eq":
+        return equals_any(values, arg)
+    if op == "$ne":
+        return not equals_any(values, arg)
+    if op == "$exists":
+        return bool(values) == bool(arg)
+    if op == "$gt":
+        return compare_any(values, arg, operator.gt)
+    if op == "$gte":
+        return compare_any(values, arg, operator.ge)
+    if op == "$lt":
+        return compare_any(values, arg, operator.lt)
+    if op == "$lte":
+        return compare_any(values, arg, operator.le)
+    if op == "$type":
+        names = arg if isinstance(arg, list) else [arg]
+        return any(is_type(value, name) for value in values for name in names)
+    if op == "$size":
+        return any(isinstance(value, list) and len(value) == arg for value in values)
+    if op == "$elemMatch":
+        return any(
+            isinstance(value, list) and any(isinstance(item, dict) and matches(item, arg) for item in value)
+            for value in values
+        )
+    if op == "$not":
+        return not match_condition(values, arg)
+    raise NotImplementedError(f"Query operator {op} is not supported by the memory engine")
+
+def is_operator_doc(cond) -> bool:
+    return isinstance(cond, dict) and bool(cond) and all(key.startswith("$") for key in cond)
+
+def match_condition(values, cond) -> bool:
+    if is_operator_doc(cond):
+        return all(match_operator(values, op, arg) for op, arg in cond.items())
+    return equals_any(values, cond)
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, q) for q in cond):
+                return False
+        elif key == "$nor":
+            if any(matches(doc, q) for q in cond):
+                return False
+        elif not match_condition(resolve(doc, key.split(".")), cond):
+            return False
+    return True
+
+# ==================== SORT & PROJECTION ====================
+
+def sort_value(value):
+    """Order values across types the way BSON does: null, numbers, strings, objects, arrays, bools, dates"""
+    if value is None or value is MISSING:
+        return (1, 0)
+    if isinstance(value, bool):
+        return (8, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, str):
+        return (3, value)
+    if isinstance(value, dict):
+        return (4, repr(value))
+    if isinstance(value, list):
+        return (5, repr(value))
+    if isinstance(value, datetime):
+        return (9, value.timestamp() if value.tzinfo else value.replace(tzinfo=timezone.utc).timestamp())
+    return (10, repr(value))
+
+def normalize_sort(key_or_list, direction=None):
+    if isinstance(key_or_list, str):
+        return [(key_or_list, 1 if direction is None else direction)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [tuple(item) for item in key_or_list]
+
+def sort_docs(docs: list, spec) -> list:
+    for field, direction in reversed(spec):
+        parts = field.split(".")
+        docs.sort(key=lambda d: sort_value((resolve(d, parts) or [None])[0]), reverse=direction == -1)
+    return docs
+
+def project(doc: dict, projection) -> dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include_id = bool(projection.get("_id", 1))
+    fields = {key: value for key, value in projection.items() if key != "_id"}
+    if fields and all(fields.values()):
+        result = {}
+        if include_id and "_id" in doc:
+            result["_id"] = doc["_id"]
+        for field in fields:
+            source, target, parts = doc, result, field.split(".")
+            for part in parts[:-1]:
+                source = source.get(part) if isinstance(source, dict) else None
+                if not isinstance(source, dict):
+                    break
+                target = target.setdefault(part, {})
+            else:
+                if isinstance(source, dict) and parts[-1] in source:
+                    target[parts[-1]] = copy.deepcopy(source[parts[-1]])
+        return result
+    result = copy.deepcopy(doc)
+    for field in fields:
+        unset_path(result, field.split("."))
+    if not include_id:
+        result.pop("_id", None)
+    return result
+
+# ==================== UPDATES ====================
+
+def array_element_matches(item, name: str, array_filters) -> bool:
+    if not name:
+        return True
+    conditions = [
+        (key, cond)
+        for array_filter in array_filters or []
+        for key, cond in array_filter.items()
+        if key == name or key.startswith(name + ".")
+    ]
+    if not conditions:
+        raise ValueError(f"No array filter found for identifier '{name}'")
+    for key, cond in conditions:
+        values = [item] if key == name else resolve(item, key[len(name) + 1:].split("."))
+        if not match_condition(values, cond):
+            return False
+    return True
+
+def set_path(target, parts, value, array_filters=None):
+    head, rest = parts[0], parts[1:]
+    if isinstance(target, list):
+        if head.startswith("$[") and head.endswith("]"):
+            for index, item in enumerate(target):
+                if array_element_matches(item, head[2:-1], array_filters):
+                    if rest:
+                        set_path(item, rest, copy.deepcopy(value), array_filters)
+                    else:
+                        target[index] = copy.deepcopy(value)
+            return
+        index = int(head)
+        while len(target) <= index:
+            target.append(None)
+        if rest:
+            if not isinstance(target[index], (dict, list)):
+                target[index] = {}
+            set_path(target[index], rest, value, array_filters)
+        else:
+            target[index] = value
+        return
+    if not rest:
+        target[head] = value
+        return
+    child = target.get(head)
+    if not isinstance(child, (dict, list)):
+        child = target[head] = {}
+    set_path(child, rest, value, array_filters)
+
+def get_path(doc, parts):
+    value = doc
+    for part in parts:
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return MISSING
+    return value
+
+def unset_path(doc, parts):
+    parent = get_path(doc, parts[:-1]) if len(parts) > 1 else doc
+    if isinstance(parent, dict):
+        parent.pop(parts[-1], None)
+    elif isinstance(parent, list) and parts[-1].isdigit() and int(parts[-1]) < len(parent):
+        parent[int(parts[-1])] = None
+
+def apply_update(doc: dict, update, array_filters=None, inserting: bool = False):
+    if isinstance(update, list):
+        for stage in update:
+            for name, spec in stage.items():
+                if name in ("$set", "$addFields"):
+                    values = {field: evaluate(expr, doc, {}) for field, expr in spec.items()}
+                    for field, value in values.items():
+                        if value is MISSING:
+                            unset_path(doc, field.split("."))
+                        else:
+                            set_path(doc, field.split("."), value)
+                elif name in ("$unset", "$project") and (name == "$unset" or not any(spec.values())):
+                    for field in [spec] if isinstance(spec, str) else spec:
+                        unset_path(doc, field.split("."))
+                else:
+                    raise NotImplementedError(f"Update stage {name} is not supported by the memory engine")
+        return
+    for op, fields in update.items():
+        for field, value in fields.items():
+            parts = field.split(".")
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                set_path(doc, parts, copy.deepcopy(value), array_filters)
+            elif op == "$setOnInsert":
+                continue
+            elif op == "$unset":
+                unset_path(doc, parts)
+            elif op == "$inc":
+                current = get_path(doc, parts)
+                set_path(doc, parts, (0 if current in (MISSING, None) else current) + value, array_filters)
+            elif op == "$push":
+                current = get_path(doc, parts)
+                items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                set_path(doc, parts, ([] if current in (MISSING, None) else current) + copy.deepcopy(items), array_filters)
+            else:
+                raise NotImplementedError(f"Update operator {op} is not supported by the memory engine")
+
+def upsert_seed(query: dict) -> dict:
+    """Equality fields of the filter become fields of the inserted document"""
+    seed = {}
+    for key, cond in query.items():
+        if key == "$and":
+            for part in cond:
+                seed.update(upsert_seed(part))
+        elif not key.startswith("$") and not is_operator_doc(cond):
+            set_path(seed, key.split("."), copy.deepcopy(cond))
+        elif isinstance(cond, dict) and "$eq" in cond:
+            set_path(seed, key.split("."), copy.deepcopy(cond["$eq"]))
+    return seed
+
+# ==================== AGGREGATION EXPRESSIONS ====================
+
+def expression_path(value, parts):
+    """Field path as an expression: paths through arrays yield arrays of the nested values"""
+    for index, part in enumerate(parts):
+        if isinstance(value, list):
+            nested = [expression_path(item, parts[index:]) for item in value if isinstance(item, dict)]
+            return [item for item in nested if item is not MISSING]
+        if not isinstance(value, dict) or part not in value:
+            return MISSING
+        value = value[part]
+    return value
+
+def evaluate(expr, doc, variables):
+    if isinstance(expr, str):
+        if expr.startswith("$$"):
+            name, _, path = expr[2:].partition(".")
+            if name == "NOW":
+                base = datetime.now(timezone.utc)
+            elif name == "ROOT" or name == "CURRENT":
+                base = doc
+            else:
+                base = variables[name]
+            return expression_path(base, path.split(".")) if path else base
+        if expr.startswith("$"):
+            return expression_path(doc, expr[1:].split("."))
+        return expr
+    if isinstance(expr, list):
+        return [evaluate(item, doc, variables) for item in expr]
+    if isinstance(expr, dict):
+        if len(expr) == 1:
+            op, arg = next(iter(expr.items()))
+            if op.startswith("$"):
+                if op not in EXPRESSIONS:
+                    raise NotImplementedError(f"Expression {op} is not supported by the memory engine")
+                return EXPRESSIONS[op](arg, doc, variables)
+        return {key: value for key, value in ((k, evaluate(v, doc, variables)) for k, v in expr.items()) if value is not MISSING}
+    return expr
+
+def present(value):
+    return None if value is MISSING else value
+
+def value_of(expr, doc, variables):
+    return present(evaluate(expr, doc, variables))
+
+def evaluate_args(arg, doc, variables):
+    return [present(evaluate(item, doc, variables)) for item in (arg if isinstance(arg, list) else [arg])]
+
+def expr_cond(arg, doc, variables):
+    if isinstance(arg, dict):
+        arg = [arg["if"], arg["then"], arg["else"]]
+    condition = value_of(arg[0], doc, variables)
+    return evaluate(arg[1] if condition not in (None, False, 0) else arg[2], doc, variables)
+
+def expr_if_null(arg, doc, variables):
+    for item in arg:
+        value = present(evaluate(item, doc, variables))
+        if value is not None:
+            return value
+    return None
+
+def expr_map(arg, doc, variables):
+    items = present(evaluate(arg["input"], doc, variables))
+    if items is None:
+        return None
+    name = arg.get("as", "this")
+    return [evaluate(arg["in"], doc, {**variables, name: item}) for item in items]
+
+def expr_merge_objects(arg, doc, variables):
+    merged = {}
+    for item in evaluate_args(arg, doc, variables):
+        if item:
+            merged.update(item)
+    return merged
+
+def expr_concat_arrays(arg, doc, variables):
+    items = evaluate_args(arg, doc, variables)
+    if any(item is None for item in items):
+        return None
+    return [value for item in items for value in item]
+
+def expr_add(arg, doc, variables):
+    values = evaluate_args(arg, doc, variables)
+    if any(value is None for value in values):
+        return None
+    dates = [value for value in values if isinstance(value, datetime)]
+    total = sum(value for value in values if not isinstance(value, datetime))
+    return dates[0] + timedelta(milliseconds=total) if dates else total
+
+def expr_date_from_string(arg, doc, variables):
+    text = present(evaluate(arg["dateString"], doc, variables))
+    if text is None:
+        return present(evaluate(arg["onNull"], doc, variables)) if "onNull" in arg else None
+    try:
+        value = datetime.fromisoformat(str(text).replace("Z", "+00:00"))
+    except ValueError:
+        if "onError" in arg:
+            return present(evaluate(arg["onError"], doc, variables))
+        raise
+    return value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def comparison(compare):
+    def evaluate_comparison(arg, doc, variables):
+        left, right = evaluate_args(arg, doc, variables)
+        if compare in (operator.eq, operator.ne):
+            return compare(left, right)
+        return compare(sort_value(left), sort_value(right))
+    return evaluate_comparison
+
+EXPRESSIONS = {
+    "$literal": lambda arg, doc, variables: arg,
+    "$cond": expr_cond,
+    "$ifNull": expr_if_null,
+    "$in": lambda arg, doc, variables: value_of(arg[0], doc, variables) in (value_of(arg[1], doc, variables) or []),
+    "$map": expr_map,
+    "$mergeObjects": expr_merge_objects,
+    "$concatArrays": expr_concat_arrays,
+    "$add": expr_add,
+    "$size": lambda arg, doc, variables: len(value_of(arg[0] if isinstance(arg, list) else arg, doc, variables)),
+    "$and": lambda arg, doc, variables: all(value not in (None, False, 0) for value in evaluate_args(arg, doc, variables)),
+    "$or": lambda arg, doc, variables: any(value not in (None, False, 0) for value in evaluate_args(arg, doc, variables)),
+    "$not": lambda arg, doc, variables: value_of(arg[0] if isinstance(arg, list) else arg, doc, variables) in (None, False, 0),
+    "$eq": comparison(operator.eq),
+    "$ne": comparison(operator.ne),
+    "$gt": comparison(operator.gt),
+    "$gte": comparison(operator.ge),
+    "$lt": comparison(operator.lt),
+    "$lte": comparison(operator.le),
+    "$dateFromString": expr_date_from_string,
+}
+
+# ==================== AGGREGATION PIPELINE ====================
+
+def group_docs(docs, spec):
+    groups = {}
+    for doc in docs:
+        key = present(evaluate(spec["_id"], doc, {}))
+        group = groups.get(freeze(key))
+        if group is None:
+            group = groups[freeze(key)] = {"_id": key}
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (op, expr), = accumulator.items()
+            value = present(evaluate(expr, doc, {}))
+            if op == "$sum":
+                group[field] = group.get(field, 0) + (value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0)
+            elif op == "$first":
+                group.setdefault(field, value)
+            elif op == "$last":
+                group[field] = value
+            elif op == "$push":
+                group.setdefault(field, []).append(value)
+            elif op == "$addToSet":
+                values = group.setdefault(field, [])
+                if value not in values:
+                    values.append(value)
+            elif op in ("$max", "$min"):
+                current = group.get(field)
+                better = operator.gt if op == "$max" else operator.lt
+                if current is None or (value is not None and better(sort_value(value), sort_value(current))):
+                    group[field] = value
+            else:
+                raise NotImplementedError(f"Accumulator {op} is not supported by the memory engine")
+    return list(groups.values())
+
+def unwind_docs(docs, spec):
+    path = spec if isinstance(spec, str) else spec["path"]
+    keep_empty = isinstance(spec, dict) and spec.get("preserveNullAndEmptyArrays", False)
+    parts = path[1:].split(".")
+    unwound = []
+    for doc in docs:
+        value = get_path(doc, parts)
+        if isinstance(value, list) and value:
+            for item in value:
+                copied = copy.copy(doc)
+                set_path(copied, parts, item)
+                unwound.append(copied)
+        elif isinstance(value, list) or value in (MISSING, None):
+            if keep_empty:
+                unwound.append(doc)
+        else:
+            unwound.append(doc)
+    return unwound
+
+def run_pipeline(docs, pipeline):
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [doc for doc in docs if matches(doc, spec)]
+        elif name == "$unwind":
+            docs = unwind_docs(docs, spec)
+        elif name == "$group":
+            docs = group_docs(docs, spec)
+        elif name == "$sort":
+            docs = sort_docs(docs, normalize_sort(spec))
+        elif name == "$skip":
+            docs = docs[spec:]
+        elif name == "$limit":
+            docs = docs[:spec]
+        elif name == "$project":
+            docs = [project(doc, spec) for doc in docs]
+        elif name == "$count":
+            docs = [{spec: len(docs)}] if docs else []
+        else:
+            raise NotImplementedError(f"Pipeline stage {name} is not supported by the memory engine")
+    return docs
+
+# ==================== CURSORS ====================
+
+class MemoryCursor:
+    """Lazy like a Motor cursor: sort/skip/limit only record options until results are read"""
+
+    def __init__(self, load):
+        self._load = load
+        self._sort = None
+        self._skip = 0
+        self._limit = 0
+        self._results = None
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def _materialize(self):
+        if self._results is None:
+            docs = self._load(self._sort)
+            docs = docs[self._skip:]
+            if self._limit:
+                docs = docs[:self._limit]
+            self._results = iter(docs)
+        return self._results
+
+    async def to_list(self, length=None):
+        results = self._materialize()
+        if length is None:
+            return list(results)
+        return [doc for _, doc in zip(range(length), results)]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._materialize())
+        except StopIteration:
+            raise StopAsyncIteration
+
+# ==================== INDEXES ====================
+
+class MemoryIndex:
+    def __init__(self, name: str, fields: list, unique: bool):
+        self.name = name
+        self.fields = fields
+        self.unique = unique
+        # leading field value -> ids, used to narrow equality and $in lookups
+        self.leading = {}
+        # full key -> id, only kept for unique indexes
+        self.keys = {}
+
+    def doc_keys(self, doc: dict) -> set:
+        # A missing field indexes as null, which is also how Mongo enforces uniqueness on it
+        per_field = [expand(resolve(doc, field.split("."))) or [None] for field in self.fields]
+        per_field = [[freeze(value) for value in values if not isinstance(value, list)] or [None] for values in per_field]
+        return set(product(*per_field))
+
+    def conflict(self, doc_id, doc: dict):
+        if not self.unique:
+            return None
+        for key in self.doc_keys(doc):
+            owner = self.keys.get(key)
+            if owner is not None and owner != doc_id:
+                return key
+        return None
+
+    def add(self, doc_id, doc: dict):
+        for key in self.doc_keys(doc):
+            self.leading.setdefault(key[0], set()).add(doc_id)
+            if self.unique:
+                self.keys[key] = doc_id
+
+    def remove(self, doc_id, doc: dict):
+        for key in self.doc_keys(doc):
+            ids = self.leading.get(key[0])
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self.leading[key[0]]
+            if self.unique and self.keys.get(key) == doc_id:
+                del self.keys[key]
+
+    def lookup(self, query: dict):
+        """Ids that can match `query`, or None when this index can't narrow it"""
+        cond = query.get(self.fields[0], MISSING)
+        if cond is MISSING:
+            return None
+        if not is_operator_doc(cond):
+            targets = [cond]
+        elif "$eq" in cond:
+            targets = [cond["$eq"]]
+        elif "$in" in cond:
+            targets = cond["$in"]
+        else:
+            return None
+        # Whole arrays and subdocuments aren't indexed as keys, only their scalar elements
+        if any(isinstance(target, (dict, list)) for target in targets):
+            return None
+        ids = set()
+        for target in targets:
+            ids |= self.leading.get(freeze(target), set())
+        return ids
+
+def duplicate_key_error(collection: str, index: MemoryIndex, key):
+    from pymongo.errors import DuplicateKeyError
+    key_value = dict(zip(index.fields, key))
+    message = f"E11000 duplicate key error collection: {collection} index: {index.name} dup key: {key_value}"
+    return DuplicateKeyError(message, 11000, {"code": 11000, "errmsg": message, "keyValue": key_value})
+
+# ==================== COLLECTIONS ====================
+
+def new_object_id():
+    try:
+        from bson import ObjectId
+    except ImportError:
+        return uuid.uuid4().hex
+    return ObjectId()
+
+class MemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        # Keyed by an internal row number (_seq) so index ownership never depends on _id itself
+        self.docs = {}
+        self.indexes = {"_id_": MemoryIndex("_id_", ["_id"], unique=True)}
+
+    # ---------- internals ----------
+
+    def _candidates(self, query: dict) -> list:
+        best = None
+        for index in self.indexes.values():
+            ids = index.lookup(query)
+            if ids is not None and (best is None or len(ids) < len(best)):
+                best = ids
+        if best is None:
+            docs = self.docs.values()
+        else:
+            # Keep insertion order so unsorted reads are stable across calls
+            docs = (doc for doc_id, doc in self.docs.items() if doc_id in best) if len(best) * 4 > len(self.docs) \
+                else sorted((self.docs[doc_id] for doc_id in best), key=lambda doc: doc["_seq"])
+        return [doc for doc in docs if matches(doc, query)]
+
+    def _check_unique(self, doc_id, doc: dict):
+        for index in self.indexes.values():
+            key = index.conflict(doc_id, doc)
+            if key is not None:
+                raise duplicate_key_error(self.name, index, key)
+
+    def _insert(self, doc: dict) -> dict:
+        if "_id" not in doc:
+            doc["_id"] = new_object_id()
+        stored = bson_copy(doc)
+        stored["_seq"] = self._next_seq()
+        self._check_unique(stored["_seq"], stored)
+        for index in self.indexes.values():
+            index.add(stored["_seq"], stored)
+        self.docs[stored["_seq"]] = stored
+        return stored
+
+    def _next_seq(self) -> int:
+        self._seq = getattr(self, "_seq", 0) + 1
+        return self._seq
+
+    def _replace(self, old: dict, new: dict):
+        doc_id = old["_seq"]
+        if new.get("_id") != old["_id"]:
+            from pymongo.errors import WriteError
+            raise WriteError("Performing an update on the path '_id' would modify the immutable field '_id'", 66)
+        self._check_unique(doc_id, new)
+        for index in self.indexes.values():
+            index.remove(doc_id, old)
+            index.add(doc_id, new)
+        self.docs[doc_id] = new
+
+    def _delete(self, doc: dict):
+        for index in self.indexes.values():
+            index.remove(doc["_seq"], doc)
+        del self.docs[doc["_seq"]]
+
+    def _sorted(self, docs: list, sort) -> list:
+        return sort_docs(list(docs), normalize_sort(sort)) if sort else list(docs)
+
+    @staticmethod
+    def _public(doc: dict, projection=None):
+        result = project(doc, projection)
+        result.pop("_seq", None)
+        return result
+
+    def _update(self, query, update, upsert, array_filters, many=False, sort=None):
+        """Returns (matched, modified, upserted_id, before, after) for the first matching document"""
+        targets = self._sorted(self._candidates(query), sort)
+        if not many:
+            targets = targets[:1]
+        if not targets:
+            if not upsert:
+                return 0, 0, None, None, None
+            doc = upsert_seed(query)
+            apply_update(doc, update, array_filters, inserting=True)
+            stored = self._insert(doc)
+            return 0, 0, stored["_id"], None, stored
+        modified = 0
+        before = after = None
+        for target in targets:
+            updated = copy.deepcopy(target)
+            apply_update(updated, update, array_filters)
+            updated = bson_copy(updated)
+            if updated != target:
+                self._replace(target, updated)
+                modified += 1
+            if before is None:
+                before, after = target, updated
+        return len(targets), modified, None, before, after
+
+    # ---------- reads ----------
+
+    def find(self, filter=None, projection=None, sort=None, skip=0, limit=0, **kwargs):
+        query = filter or {}
+        cursor = MemoryCursor(lambda order: [self._public(doc, projection) for doc in self._sorted(self._candidates(query), order)])
+        if sort:
+            cursor.sort(sort)
+        return cursor.skip(skip).limit(limit)
+
+    async def find_one(self, filter=None, projection=None, sort=None, **kwargs):
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        docs = self._sorted(self._candidates(filter or {}), sort)
+        return self._public(docs[0], projection) if docs else None
+
+    async def count_documents(self, filter=None, **kwargs):
+        return len(self._candidates(filter or {}))
+
+    async def estimated_document_count(self, **kwargs):
+        return len(self.docs)
+
+    async def distinct(self, key: str, filter=None, **kwargs):
+        values = []
+        for doc in self._candidates(filter or {}):
+            for value in expand(resolve(doc, key.split("."))):
+                if not isinstance(value, list) and value not in values:
+                    values.append(value)
+        return values
+
+    def aggregate(self, pipeline, **kwargs):
+        def load(order):
+            docs = [self._public(doc) for doc in self.docs.values()]
+            return sort_docs(run_pipeline(docs, pipeline), order) if order else run_pipeline(docs, pipeline)
+        return MemoryCursor(load)
+
+    # ---------- writes ----------
+
+    async def insert_one(self, document: dict, **kwargs):
+        stored = self._insert(document)
+        return SimpleNamespace(inserted_id=stored["_id"], acknowledged=True)
+
+    async def insert_many(self, documents, ordered: bool = True, **kwargs):
+        ids = []
+        for document in documents:
+            ids.append(self._insert(document)["_id"])
+        return SimpleNamespace(inserted_ids=ids, acknowledged=True)
+
+    async def update_one(self, filter, update, upsert=False, array_filters=None, **kwargs):
+        matched, modified, upserted_id, _, _ = self._update(filter, update, upsert, array_filters)
+        return SimpleNamespace(matched_count=matched, modified_count=modified, upserted_id=upserted_id, acknowledged=True)
+
+    async def update_many(self, filter, update, upsert=False, array_filters=None, **kwargs):
+        matched, modified, upserted_id, _, _ = self._update(filter, update, upsert, array_filters, many=True)
+        return SimpleNamespace(matched_count=matched, modified_count=modified, upserted_id=upserted_id, acknowledged=True)
+
+    async def find_one_and_update(self, filter, update, projection=None, sort=None, upsert=False,
+                                  return_document=False, array_filters=None, **kwargs):
+        # pymongo's ReturnDocument.AFTER is True and BEFORE is False
+        _, _, _, before, after = self._update(filter, update, upsert, array_filters, sort=sort)
+        doc = after if return_document else before
+        return self._public(doc, projection) if doc is not None else None
+
+    async def find_one_and_delete(self, filter, projection=None, sort=None, **kwargs):
+        docs = self._sorted(self._candidates(filter), sort)
+        if not docs:
+            return None
+        self._delete(docs[0])
+        return self._public(docs[0], projection)
+
+    async def delete_one(self, filter, **kwargs):
+        docs = self._candidates(filter)
+        if docs:
+            self._delete(docs[0])
+        return SimpleNamespace(deleted_count=min(len(docs), 1), acknowledged=True)
+
+    async def delete_many(self, filter, **kwargs):
+        docs = self._candidates(filter)
+        for doc in docs:
+            self._delete(doc)
+        return SimpleNamespace(deleted_count=len(docs), acknowledged=True)
+
+    async def bulk_write(self, requests, ordered: bool = True, **kwargs):
+        from pymongo import DeleteOne, InsertOne, UpdateOne
+        from pymongo.errors import BulkWriteError, DuplicateKeyError
+        result = {"nInserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "nUpserted": 0, "upserted": [], "writeErrors": []}
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, UpdateOne):
+                    matched, modified, upserted_id, _, _ = self._update(
+                        request._filter, request._doc, request._upsert, getattr(request, "_array_filters", None)
+                    )
+                    result["nMatched"] += matched
+                    result["nModified"] += modified
+                    if upserted_id is not None:
+                        result["nUpserted"] += 1
+                        result["upserted"].append({"index": index, "_id": upserted_id})
+                elif isinstance(request, InsertOne):
+                    self._insert(request._doc)
+                    result["nInserted"] += 1
+                elif isinstance(request, DeleteOne):
+                    docs = self._candidates(request._filter)
+                    if docs:
+                        self._delete(docs[0])
+                        result["nRemoved"] += 1
+                else:
+                    raise NotImplementedError(f"{type(request).__name__} is not supported by the memory engine")
+            except DuplicateKeyError as e:
+                result["writeErrors"].append({"index": index, "code": e.code, "errmsg": str(e), "op": request._doc})
+                if ordered:
+                    break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return SimpleNamespace(
+            inserted_count=result["nInserted"],
+            matched_count=result["nMatched"],
+            modified_count=result["nModified"],
+            deleted_count=result["nRemoved"],
+            upserted_count=result["nUpserted"],
+            upserted_ids={u["index"]: u["_id"] for u in result["upserted"]},
+            acknowledged=True,
+        )
+
+    # ---------- indexes ----------
+
+    async def create_index(self, keys, unique: bool = False, name: str = None, **kwargs):
+        fields = [keys] if isinstance(keys, str) else [key if isinstance(key, str) else key[0] for key in keys]
+        name = name or "_".join(f"{field}_1" for field in fields)
+        if name in self.indexes:
+            return name
+        index = MemoryIndex(name, fields, unique)
+        for doc_id, doc in self.docs.items():
+            key = index.conflict(doc_id, doc)
+            if key is not None:
+                raise duplicate_key_error(self.name, index, key)
+            index.add(doc_id, doc)
+        self.indexes[name] = index
+        return name
+
+    async def create_indexes(self, indexes, **kwargs):
+        """pymongo IndexModel instances, as passed to Motor's create_indexes"""
+        names = []
+        for model in indexes:
+            spec = model.document
+            names.append(await self.create_index(list(spec["key"].items()), unique=spec.get("unique", False), name=spec["name"]))
+        return names
+
+    async def drop_index(self, name: str, **kwargs):
+        self.indexes.pop(name, None)
+
+    async def index_information(self):
+        return {name: {"key": [(field, 1) for field in index.fields], "unique": index.unique} for name, index in self.indexes.items()}
+
+# ==================== DATABASE & CLIENT ====================
+
+class MemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self.collections = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        collection = self.collections.get(name)
+        if collection is None:
+            collection = self.collections[name] = MemoryCollection(name)
+        return collection
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def command(self, command, **kwargs):
+        name = command if isinstance(command, str) else next(iter(command))
+        if name == "ping":
+            return {"ok": 1.0}
+        raise NotImplementedError(f"Command {name} is not supported by the memory engine")
+
+    async def list_collection_names(self, **kwargs):
+        return [name for name, collection in self.collections.items() if collection.docs]
+
+    async def drop_collection(self, name: str, **kwargs):
+        self.collections.pop(name, None)
+
+class MemoryClient:
+    """Stand-in for AsyncIOMotorClient; `path` optionally persists the data between runs"""
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.databases = {}
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        database = self.databases.get(name)
+        if database is None:
+            database = self.databases[name] = MemoryDatabase(name)
+        return database
+
+    def get_database(self, name: str, **kwargs) -> MemoryDatabase:
+        # Read preferences and write concerns have nothing to route to in-process
+        return self[name]
+
+    def load(self, path: str):
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        for db_name, collections in data.items():
+            database = self[db_name]
+            for name, docs in collections.items():
+                collection = database[name]
+                for doc in docs:
+                    collection._insert(doc)
+        logger.info("Loaded memory engine data from %s", path)
+
+    def save(self, path: str):
+        data = {
+            db_name: {
+                name: [MemoryCollection._public(doc) for doc in collection.docs.values()]
+                for name, collection in database.collections.items()
+            }
+            for db_name, database in self.databases.items()
+        }
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def close(self):
+        if self.path:
+            self.save(self.path)
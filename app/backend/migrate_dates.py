@@ -0,0 +1,23 @@
+"""One-off migration from ISO-string timestamps to native BSON dates
+
+Converts createdAt/updatedAt on every collection in place (server side, via
+$dateFromString) and backfills Event.startsAt from the free-form date/time
+fields. Safe to run more than once: only string values and events without
+startsAt are touched.
+
+    python migrate_dates.py
+"""
+import asyncio
+
+import server
+
+
+async def main():
+    async with server.lifespan(server.app):
+        converted = await server.migrate_dates()
+    for field, count in converted.items():
+        print(f"{field:>24}: {count}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+"""Production launcher for the Geunaseh Jeumala API
+
+Pre-forks one uvicorn worker per CPU (override with --workers or WEB_CONCURRENCY)
+on uvloop + httptools. Each worker runs the app lifespan, which warms up the
+MongoDB pool before the worker starts accepting connections. On SIGTERM the
+workers stop accepting, drain in-flight requests for up to --graceful-timeout
+seconds and close their DB clients.
+
+    python run.py --port 8001
+"""
+import argparse
+import os
+
+import uvicorn
+
+
+def worker_count(requested: int) -> int:
+    """Workers actually started for a requested count"""
+    # With STORAGE_ENGINE=memory each worker would hold its own copy of the data
+    return 1 if os.environ.get("STORAGE_ENGINE") == "memory" else requested
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with multiple workers")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8001")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.environ.get("GRACEFUL_TIMEOUT", "30")))
+    parser.add_argument("--keep-alive", type=int, default=int(os.environ.get("KEEP_ALIVE", "5")))
+    parser.add_argument("--backlog", type=int, default=2048)
+    # Proxies whose X-Forwarded-For is believed; the client IP is the last hop not in this list
+    parser.add_argument("--forwarded-allow-ips", default=os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1"))
+    parser.add_argument("--log-level", default=os.environ.get("LOG_LEVEL", "info"))
+    args = parser.parse_args()
+    if worker_count(args.workers) != args.workers:
+        print(f"STORAGE_ENGINE=memory keeps data in-process, running 1 worker instead of {args.workers}")
+        args.workers = worker_count(args.workers)
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    uvicorn.run(
+        "server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop",
+        http="httptools",
+        lifespan="on",
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+        access_log=False,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
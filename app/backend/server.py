@@ -1,32 +1,375 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Form, Request, Header, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, RedirectResponse, StreamingResponse, PlainTextResponse
 import os
+import asyncio
+import atexit
+import contextvars
 import logging
+import queue
+import sys
+import threading
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener
+import math
+import re
+import time
+import hashlib
+from collections import Counter
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from pathlib import Path
+from urllib.parse import unquote
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import Any, List, Optional
 import uuid
+from abc import ABC, abstractmethod
 from datetime import datetime, timezone, timedelta
-from passlib.context import CryptContext
-from jose import JWTError, jwt
-import aiofiles
 import json
 
+# motor/pymongo, passlib, jose and aiofiles are resolved once, when the lifespan creates the
+# clients (create_client, create_upload_storage) or by a cached accessor (get_pwd_context,
+# get_jwt), so importing this module stays cheap for --reload and cold starts; see bench_startup.py
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# Create uploads directory
+# Uploads directory for the local storage backend
 UPLOAD_DIR = ROOT_DIR / "uploads"
-UPLOAD_DIR.mkdir(exist_ok=True)
+
+# Storage engine: "motor" (MongoDB) or "memory" (in-process, see memory_engine.py)
+STORAGE_ENGINE = os.environ.get('STORAGE_ENGINE', 'motor')
+# Optional pickle file the memory engine loads at startup and writes on shutdown
+MEMORY_ENGINE_FILE = os.environ.get('MEMORY_ENGINE_FILE', '')
 
 # MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'geunaseh_jeumala')]
+mongo_url = os.environ['MONGO_URL'] if STORAGE_ENGINE == 'motor' else os.environ.get('MONGO_URL')
+DB_NAME = os.environ.get('DB_NAME', 'geunaseh_jeumala')
+
+# Connection pool settings
+MONGO_POOL_OPTIONS = {
+    "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+    "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', '0')),
+    "maxIdleTimeMS": int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '300000')),
+    "waitQueueTimeoutMS": int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '5000')),
+    "connectTimeoutMS": int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+    "socketTimeoutMS": int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '20000')),
+    "serverSelectionTimeoutMS": int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+}
+# Comma separated list, e.g. "zstd,snappy,zlib"; empty disables wire compression
+MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', '')
+
+# Read routing for anonymous public traffic; admin reads and all writes stay on the primary
+PUBLIC_READ_PREFERENCE = os.environ.get('MONGO_PUBLIC_READ_PREFERENCE', 'secondaryPreferred')
+PUBLIC_MAX_STALENESS_SECONDS = int(os.environ.get('MONGO_PUBLIC_MAX_STALENESS_SECONDS', '90'))
+
+class PoolStats:
+    """Tracks connection pool usage per server from pymongo's CMAP events"""
+
+    def __init__(self):
+        self.servers = {}
+
+    def _server(self, address):
+        key = "%s:%s" % address
+        return self.servers.setdefault(key, Counter())
+
+    def snapshot(self):
+        return {
+            server: {
+                "open": stats["created"] - stats["closed"],
+                "checkedOut": stats["checked_out"] - stats["checked_in"],
+                "waiting": stats["check_out_started"] - stats["checked_out"] - stats["check_out_failed"],
+                "checkOutFailures": stats["check_out_failed"],
+                "cleared": stats["cleared"],
+            }
+            for server, stats in self.servers.items()
+        }
+
+    def pool_created(self, event):
+        self._server(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._server(event.address)["cleared"] += 1
+
+    def pool_closed(self, event):
+        self.servers.pop("%s:%s" % event.address, None)
+
+    def connection_created(self, event):
+        self._server(event.address)["created"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._server(event.address)["closed"] += 1
+
+    def connection_check_out_started(self, event):
+        self._server(event.address)["check_out_started"] += 1
+
+    def connection_check_out_failed(self, event):
+        self._server(event.address)["check_out_failed"] += 1
+
+    def connection_checked_out(self, event):
+        self._server(event.address)["checked_out"] += 1
+
+    def connection_checked_in(self, event):
+        self._server(event.address)["checked_in"] += 1
+
+# Listener instances are created together with the client, see create_mongo_client()
+pool_stats = None
+
+# ==================== REQUEST TRACING ====================
+
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '500'))
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '100'))
+MAX_TRACED_QUERIES = 200
+
+class RequestTrace:
+    def __init__(self, trace_id: str, method: str, path: str):
+        self.trace_id = trace_id
+        self.method = method
+        self.path = path
+        self.queries = []
+        self.pending = {}
+
+# Motor runs pymongo on executor threads with a copy of the caller's context,
+# so the listener below sees the trace of the request that issued the command
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+def filter_shape(value):
+    """Replace literal values with their type names, keeping field and operator names"""
+    if isinstance(value, dict):
+        return {k: filter_shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [filter_shape(v) for v in value[:3]]
+    return type(value).__name__
+
+def command_filter(name: str, command):
+    if name in ("find", "count", "distinct"):
+        return command.get("filter") or command.get("query") or {}
+    if name == "findAndModify":
+        return command.get("query", {})
+    if name in ("update", "delete"):
+        statements = command.get("updates") or command.get("deletes") or [{}]
+        return statements[0].get("q", {})
+    if name == "aggregate":
+        pipeline = command.get("pipeline") or [{}]
+        return pipeline[0].get("$match", {})
+    return {}
+
+def reply_count(name: str, reply) -> int:
+    cursor = reply.get("cursor")
+    if cursor:
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if name == "findAndModify":
+        return 1 if reply.get("value") else 0
+    return reply.get("n", 0)
+
+class QueryTracer:
+    """Records timing, collection, filter shape and result size of every command per request"""
+
+    def started(self, event):
+        trace = current_trace.get()
+        if trace is None or len(trace.queries) >= MAX_TRACED_QUERIES:
+            return
+        command = event.command
+        collection = command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = command.get("collection")
+        trace.pending[event.request_id] = {
+            "op": event.command_name,
+            "collection": collection if isinstance(collection, str) else None,
+            "filter": filter_shape(command_filter(event.command_name, command)),
+        }
+
+    def succeeded(self, event):
+        self._finish(event, docs=reply_count(event.command_name, event.reply))
+
+    def failed(self, event):
+        self._finish(event, error=str(event.failure.get("errmsg", event.failure)))
+
+    def _finish(self, event, **result):
+        trace = current_trace.get()
+        if trace is None:
+            return
+        query = trace.pending.pop(event.request_id, None)
+        if query is None:
+            return
+        query["ms"] = round(event.duration_micros / 1000, 2)
+        query.update(result)
+        trace.queries.append(query)
+        if query["ms"] >= SLOW_QUERY_MS:
+            slow_logger.warning(json.dumps({"type": "slow_query", "traceId": trace.trace_id, "path": trace.path, **query}, default=str))
+
+query_tracer = None
+
+def public_read_preference():
+    from pymongo import read_preferences
+    if PUBLIC_READ_PREFERENCE == "primary":
+        return read_preferences.Primary()
+    modes = {
+        "primaryPreferred": read_preferences.PrimaryPreferred,
+        "secondary": read_preferences.Secondary,
+        "secondaryPreferred": read_preferences.SecondaryPreferred,
+        "nearest": read_preferences.Nearest,
+    }
+    return modes[PUBLIC_READ_PREFERENCE](max_staleness=PUBLIC_MAX_STALENESS_SECONDS)
+
+def create_mongo_client():
+    global pool_stats, query_tracer
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pymongo import monitoring
+    # pymongo only accepts listeners derived from its own base classes
+    pool_stats = type("PoolStatsListener", (PoolStats, monitoring.ConnectionPoolListener), {})()
+    query_tracer = type("QueryTracerListener", (QueryTracer, monitoring.CommandListener), {})()
+    # tz_aware so stored dates come back as UTC-aware datetimes and serialize with their offset
+    options = dict(MONGO_POOL_OPTIONS, tz_aware=True)
+    if MONGO_COMPRESSORS:
+        options["compressors"] = MONGO_COMPRESSORS
+    return AsyncIOMotorClient(mongo_url, event_listeners=[pool_stats, query_tracer], **options)
+
+# pymongo names used on request paths, bound once by bind_pymongo() rather than imported per call
+IndexModel = ReturnDocument = UpdateOne = None
+BulkWriteError = ConnectionFailure = DuplicateKeyError = WriteError = None
+
+def bind_pymongo():
+    global IndexModel, ReturnDocument, UpdateOne, BulkWriteError, ConnectionFailure, DuplicateKeyError, WriteError
+    from pymongo import IndexModel, ReturnDocument, UpdateOne
+    from pymongo.errors import BulkWriteError, ConnectionFailure, DuplicateKeyError, WriteError
+
+def create_client():
+    """Client for the configured engine; both expose client[DB_NAME] with the same collection API"""
+    # Both engines take pymongo's operation classes and raise its errors
+    bind_pymongo()
+    if STORAGE_ENGINE == "memory":
+        from memory_engine import MemoryClient
+        return MemoryClient(MEMORY_ENGINE_FILE or None)
+    if STORAGE_ENGINE != "motor":
+        raise RuntimeError(f"Unknown STORAGE_ENGINE '{STORAGE_ENGINE}', expected 'motor' or 'memory'")
+    return create_mongo_client()
+
+# Connections each worker opens before it accepts traffic
+WARMUP_CONNECTIONS = int(os.environ.get('MONGO_WARMUP_CONNECTIONS', str(max(1, MONGO_POOL_OPTIONS["minPoolSize"]))))
+
+# Set up in the app lifespan: `db` for admin reads and writes, `public_db` for anonymous reads
+client = None
+db = None
+public_db = None
+
+@asynccontextmanager
+async def lifespan(app):
+    global client, db, public_db, upload_storage
+    upload_storage = create_upload_storage()
+    client = create_client()
+    db = client[DB_NAME]
+    if STORAGE_ENGINE == "motor":
+        public_db = client.get_database(DB_NAME, read_preference=public_read_preference())
+    else:
+        public_db = db
+    # Skip warm-up when the database is down so the worker (and /api/health) comes up promptly
+    if await ensure_indexes():
+        await warm_up()
+    view_counter.start()
+    upload_collector.start()
+    yield
+    await upload_collector.stop()
+    await view_counter.stop()
+    if registration_buffer:
+        await registration_buffer.close()
+    client.close()
+
+# (collection, keys, options) created at startup; create_index is a no-op when it already exists
+INDEXES = [
+    # One registration per email per event; register_event upserts against it
+    ("registrations", [("eventId", 1), ("email", 1)], {"unique": True, "name": "event_email_unique"}),
+    # Page upserts rely on this to turn a lost version race into a conflict instead of a second page
+    ("pages", [("pageId", 1)], {"unique": True, "name": "page_id_unique"}),
+    ("view_counts", [("collection", 1), ("docId", 1)], {"unique": True, "name": "collection_doc_unique"}),
+    ("view_counts", [("collection", 1), ("views", -1)], {"name": "collection_views"}),
+    # Date-range listings; "upcoming events" is a bounded scan over startsAt
+    ("events", [("startsAt", 1)], {"name": "starts_at"}),
+    ("articles", [("createdAt", -1)], {"name": "created_at"}),
+    # Multikey: serves tag= filtering already in createdAt order
+    ("articles", [("tags", 1), ("createdAt", -1)], {"name": "tags_created_at"}),
+    ("documents", [("docType", 1), ("createdAt", -1)], {"name": "doc_type_created_at"}),
+    ("documents", [("createdAt", -1)], {"name": "created_at"}),
+    ("media", [("createdAt", -1)], {"name": "created_at"}),
+    # Point lookups by the handlers; also what the memory engine narrows equality filters with
+    *[(collection, [("id", 1)], {"name": "id"}) for collection in ("articles", "events", "documents", "media", "members", "tasks", "users")],
+    *[(collection, [("slug", 1)], {"name": "slug"}) for collection in ("articles", "events", "documents")],
+    ("users", [("username", 1)], {"name": "username"}),
+    ("settings", [("key", 1)], {"name": "key"}),
+]
+
+# Unique indexes the write paths rely on for correctness, with the fix for existing duplicates
+REQUIRED_INDEXES = {
+    "event_email_unique": "python dedupe_registrations.py",
+    "page_id_unique": "remove duplicate pageId documents from the pages collection",
+}
+
+async def ensure_collection_indexes(collection: str, specs: List[tuple]):
+    try:
+        # One createIndexes command per collection
+        await db[collection].create_indexes([IndexModel(keys, **options) for keys, options in specs])
+        return
+    except ConnectionFailure:
+        raise
+    except Exception:
+        # The command fails as a whole; redo one by one to keep the good ones and name the bad one
+        pass
+    for keys, options in specs:
+        try:
+            await db[collection].create_index(keys, **options)
+        except ConnectionFailure:
+            raise
+        except DuplicateKeyError as e:
+            fix = REQUIRED_INDEXES.get(options["name"])
+            if fix:
+                # Without the index, registration dedup / page version checks silently stop working
+                raise RuntimeError(f"Unique index {options['name']} on {collection} cannot be built over existing duplicates ({e}); fix: {fix}")
+            logger.warning("Creating index %s on %s failed: %s", options["name"], collection, e)
+        except Exception as e:
+            logger.warning("Creating index %s on %s failed: %s", options["name"], collection, e)
+
+async def ensure_indexes() -> bool:
+    """Create INDEXES, all collections concurrently; False when the database is unreachable"""
+    try:
+        # One probe first: an unreachable server then costs a single server-selection timeout
+        await db.command("ping")
+    except ConnectionFailure as e:
+        logger.warning("Database unreachable, indexes not verified: %s", e)
+        return False
+    by_collection = {}
+    for collection, keys, options in INDEXES:
+        by_collection.setdefault(collection, []).append((keys, options))
+    results = await asyncio.gather(
+        *(ensure_collection_indexes(collection, specs) for collection, specs in by_collection.items()),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, ConnectionFailure):
+            logger.warning("Database unreachable, indexes not verified: %s", result)
+            return False
+        if isinstance(result, BaseException):
+            raise result
+    return True
+
+async def warm_up():
+    """Open pool connections and prime read paths so the first requests don't pay for it"""
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(db.command("ping") for _ in range(WARMUP_CONNECTIONS)))
+        await public_db.command("ping")
+        await get_galaxy_layout()
+    except Exception as e:
+        logger.warning("DB warm-up failed: %s", e)
+        return
+    logger.info("Worker %s warmed up in %.1f ms", os.getpid(), (time.perf_counter() - started) * 1000)
 
 # JWT Settings
 SECRET_KEY = os.environ.get('JWT_SECRET', 'geunaseh-jeumala-secret-key-2025')
@@ -37,13 +380,24 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 ADMIN_SECRET_CODE = "<Mavecode300107>"
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# python-jose's jwt module (JWTError included)
+@lru_cache(maxsize=None)
+def get_jwt():
+    from jose import jwt
+    return jwt
 
 # Security
 security = HTTPBearer()
+# Same scheme without the 403, for routes open to everyone that treat admins differently
+optional_security = HTTPBearer(auto_error=False)
 
 # Create the main app
-app = FastAPI(title="Geunaseh Jeumala API")
+app = FastAPI(title="Geunaseh Jeumala API", lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -91,8 +445,18 @@ class PageContent(BaseModel):
     heroDescription: Optional[str] = ""
     heroImage: Optional[str] = ""
     sections: Optional[List[dict]] = []
+    version: int = 0  # bumped on every write; PATCH callers send it back to detect concurrent edits
     updatedAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+# Partial page updates
+class PagePatch(BaseModel):
+    version: Optional[int] = None
+    data: dict
+
+class PageItemPatch(BaseModel):
+    version: Optional[int] = None
+    value: Any
+
 # Article
 class ArticleCreate(BaseModel):
     title: str
@@ -173,6 +537,7 @@ class Event(BaseModel):
     description: Optional[str] = ""
     bannerImage: Optional[str] = ""
     capacity: Optional[int] = 0
+    startsAt: Optional[datetime] = None  # parsed from date + time, used for sorting and ranges
     createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updatedAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -230,19 +595,20 @@ class Member(BaseModel):
 # ==================== HELPERS ====================
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = get_jwt().encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    jwt = get_jwt()
     try:
         payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
@@ -252,17 +618,310 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         if user is None:
             raise HTTPException(status_code=401, detail="User not found")
         return user
-    except JWTError:
+    except jwt.JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+async def get_read_db(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)):
+    """Handle for the public GET routes: the primary for a signed-in admin, who must see their
+    own edits, and the possibly lagging public_db for anonymous traffic"""
+    if credentials is None:
+        return public_db
+    jwt = get_jwt()
+    try:
+        # Routing only, not authorization: a valid signature is enough, no user lookup
+        jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.JWTError:
+        return public_db
+    return db
+
 def serialize_datetime(obj):
     if isinstance(obj, datetime):
         return obj.isoformat()
     return obj
 
+# Event dates/times are entered in local time (WIB by default)
+EVENT_TIMEZONE = timezone(timedelta(hours=float(os.environ.get('EVENT_UTC_OFFSET_HOURS', '7'))))
+
+def parse_event_date(date: str, time_text: Optional[str] = "") -> Optional[datetime]:
+    """Start of an event from its "YYYY-MM-DD" date and free-form time, e.g. 09:00 - 15:00 WIB"""
+    try:
+        day = datetime.strptime((date or "").strip()[:10], "%Y-%m-%d")
+    except ValueError:
+        return None
+    match = re.search(r"(\d{1,2})[:.](\d{2})", time_text or "")
+    hour, minute = (int(match[1]), int(match[2])) if match else (0, 0)
+    if hour > 23 or minute > 59:
+        hour, minute = 0, 0
+    return day.replace(hour=hour, minute=minute, tzinfo=EVENT_TIMEZONE)
+
+def parse_query_datetime(value: str, tz=timezone.utc) -> datetime:
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=tz)
+
+def date_range_filter(start: Optional[str], end: Optional[str], tz=timezone.utc) -> dict:
+    bounds = {}
+    if start:
+        bounds["$gte"] = parse_query_datetime(start, tz)
+    if end:
+        # A bare date ("2025-07-31") includes that whole day
+        if len(end) == 10:
+            bounds["$lt"] = parse_query_datetime(end, tz) + timedelta(days=1)
+        else:
+            bounds["$lte"] = parse_query_datetime(end, tz)
+    return bounds
+
+DATE_FIELDS = ["createdAt", "updatedAt"]
+DATED_COLLECTIONS = ["users", "pages", "articles", "media", "documents", "events", "registrations", "tasks", "settings"]
+
+async def migrate_dates() -> dict:
+    """Convert ISO-string timestamps to BSON dates and backfill Event.startsAt"""
+    converted = {}
+    for collection in DATED_COLLECTIONS:
+        for field in DATE_FIELDS:
+            # Server-side conversion, one command per field
+            result = await db[collection].update_many(
+                {field: {"$type": "string"}},
+                [{"$set": {field: {"$dateFromString": {"dateString": "$" + field, "onError": "$" + field}}}}]
+            )
+            converted[f"{collection}.{field}"] = result.modified_count
+    backfilled = 0
+    async for event in db.events.find({"startsAt": {"$exists": False}}, {"_id": 0, "id": 1, "date": 1, "time": 1}):
+        await db.events.update_one(
+            {"id": event["id"]},
+            {"$set": {"startsAt": parse_event_date(event.get("date", ""), event.get("time", ""))}}
+        )
+        backfilled += 1
+    converted["events.startsAt"] = backfilled
+    return converted
+
+# ==================== RATE LIMITING ====================
+
+def parse_rate(value: str):
+    """Parse a "<requests>/<seconds>" budget into (refill per second, burst)"""
+    requests, _, seconds = value.partition("/")
+    burst = int(requests)
+    return burst / float(seconds or 1), burst
+
+# Per-route budgets, overridable with RATE_LIMIT_<ROUTE>="<requests>/<seconds>"
+RATE_LIMITS = {
+    route: parse_rate(os.environ.get(f"RATE_LIMIT_{route.upper()}", default))
+    for route, default in {
+        "login": "5/60",
+        "signup": "3/300",
+        "register": "10/60",
+    }.items()
+}
+
+# Global cap on in-flight requests; beyond this we shed load instead of queuing
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("MAX_CONCURRENT_REQUESTS", "256"))
+
+class TokenBucketLimiter:
+    """In-process token buckets keyed by (client IP, route)"""
+
+    max_buckets = 10000
+
+    def __init__(self, limits: dict):
+        self.limits = limits
+        # Least recently used first, so the bucket evicted when full is the one idle longest
+        self.buckets = OrderedDict()
+
+    def acquire(self, route: str, client_ip: str) -> float:
+        """Take one token; returns 0 when allowed, otherwise seconds until the next token"""
+        rate, burst = self.limits[route]
+        now = time.monotonic()
+        key = (client_ip, route)
+        tokens, last = self.buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - last) * rate)
+        if tokens < 1:
+            retry_after = (1 - tokens) / rate
+        else:
+            tokens -= 1
+            retry_after = 0.0
+        self.buckets[key] = (tokens, now)
+        self.buckets.move_to_end(key)
+        # O(1) per request however many clients are tracked
+        while len(self.buckets) > self.max_buckets:
+            self.buckets.popitem(last=False)
+        return retry_after
+
+rate_limiter = TokenBucketLimiter(RATE_LIMITS)
+limiter_stats = {"rate_limited": Counter(), "overloaded": 0, "in_flight": 0}
+
+def get_client_ip(request: Request) -> str:
+    # Behind a proxy, uvicorn's proxy_headers already replaced this with the nearest untrusted
+    # X-Forwarded-For hop (see --forwarded-allow-ips in run.py); the header itself is client-controlled
+    return request.client.host if request.client else "unknown"
+
+def rate_limit(route: str):
+    async def dependency(request: Request):
+        retry_after = rate_limiter.acquire(route, get_client_ip(request))
+        if retry_after:
+            limiter_stats["rate_limited"][route] += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+    return dependency
+
+# ==================== STATIC SNAPSHOTS ====================
+
+# Directory nginx/CDN serves public JSON from; exporting is disabled when unset
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', '')
+
+# Mirrors the public list endpoints: collection -> (item key field, sort, list limit)
+SNAPSHOT_COLLECTIONS = {
+    "pages": ("pageId", None, 100),
+    "articles": ("slug", ("createdAt", -1), 100),
+    "documents": ("slug", ("createdAt", -1), 100),
+    "events": ("slug", ("startsAt", -1), 100),
+    "media": (None, ("createdAt", -1), 100),
+    "members": (None, None, 200),
+}
+# GET /api/documents?doc_type=... for these is exported to documents/type/{docType}.json
+SNAPSHOT_DOC_TYPES = ("documentation", "activity", "report")
+
+def snapshot_path(*parts: str) -> Optional[Path]:
+    # Keys come from slugs and page ids; never let one escape the snapshot directory
+    if any(not part or part in (".", "..") or "/" in part or "\\" in part for part in parts):
+        return None
+    return Path(SNAPSHOT_DIR).joinpath(*parts[:-1], parts[-1] + ".json")
+
+def write_snapshot(path: Path, body: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per write, not per process: one worker can write the same file from two threads at once
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp_path.write_text(body, encoding="utf-8")
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+async def save_snapshot(data, *parts: str):
+    path = snapshot_path(*parts)
+    if path is None:
+        return
+    body = data if isinstance(data, str) else json.dumps(data, default=serialize_datetime, separators=(",", ":"))
+    await asyncio.to_thread(write_snapshot, path, body)
+
+async def remove_snapshot(*parts: str):
+    path = snapshot_path(*parts)
+    if path is not None:
+        await asyncio.to_thread(path.unlink, True)
+
+async def export_list(collection: str):
+    key, sort, limit = SNAPSHOT_COLLECTIONS[collection]
+    cursor = db[collection].find({}, {"_id": 0})
+    if sort:
+        cursor = cursor.sort(*sort)
+    items = await cursor.to_list(limit)
+    # Lists live beside the item directory ({collection}.json), so no slug or page id can overwrite them
+    await save_snapshot(items, collection)
+    if collection == "documents":
+        # Queried per type like get_documents does: filtering the overall list would miss
+        # older documents of a type once there are more than `limit` in total
+        for doc_type in SNAPSHOT_DOC_TYPES:
+            typed = await db.documents.find({"docType": doc_type}, {"_id": 0}).sort(*sort).to_list(limit)
+            await save_snapshot(typed, collection, "type", doc_type)
+    if collection == "members":
+        _, body = await get_galaxy_layout()
+        await save_snapshot(body, collection, "galaxy")
+    if collection == "articles":
+        await save_snapshot(await get_tag_counts(), "tags")
+
+async def export_item(collection: str, value: str):
+    key, _, _ = SNAPSHOT_COLLECTIONS[collection]
+    item = await db[collection].find_one({key: value}, {"_id": 0})
+    if item:
+        await save_snapshot(item, collection, value)
+    else:
+        await remove_snapshot(collection, value)
+
+async def export_logo():
+    settings = await db.settings.find_one({"key": "logo"}, {"_id": 0})
+    await save_snapshot({"logoUrl": settings.get("value", "") if settings else ""}, "settings", "logo")
+
+async def refresh_snapshots(collection: str, *keys: str):
+    """Regenerate the list file and the given item files after an admin write"""
+    if not SNAPSHOT_DIR:
+        return
+    try:
+        if collection == "settings":
+            await export_logo()
+            return
+        await export_list(collection)
+        for value in set(keys):
+            await export_item(collection, value)
+    except Exception as e:
+        # Snapshots lag behind until the next write or full export; the API stays authoritative
+        logger.exception("Snapshot refresh for %s failed: %s", collection, e)
+
+async def export_all_snapshots():
+    """Full export of every public endpoint"""
+    files = 0
+    for collection, (key, _, _) in SNAPSHOT_COLLECTIONS.items():
+        await export_list(collection)
+        files += 1
+        if key:
+            exported = set()
+            async for item in db[collection].find({}, {"_id": 0}):
+                await save_snapshot(item, collection, item[key])
+                exported.add(item[key])
+            files += len(exported)
+            # Drop files left behind by items deleted while exporting was off
+            for path in Path(SNAPSHOT_DIR, collection).glob("*.json"):
+                if path.stem not in exported:
+                    await asyncio.to_thread(path.unlink, True)
+    await export_logo()
+    return files + 1
+
+# ==================== READ COALESCING ====================
+
+# Share one in-flight query between concurrent identical reads of the hot detail routes
+READ_COALESCING = os.environ.get('READ_COALESCING', 'true').lower() == 'true'
+
+class SingleFlight:
+    """Calls with the same key while one is in flight await that call instead of querying again
+
+    Followers get the leader's result object itself, so handlers must treat it as read-only.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.inflight = {}
+        # handler -> {"queries": leader calls, "collapsed": calls that shared one}
+        self.stats = {}
+
+    async def run(self, handler: str, key: tuple, fetch):
+        if not self.enabled:
+            return await fetch()
+        stats = self.stats.setdefault(handler, {"queries": 0, "collapsed": 0})
+        flight_key = (handler, *key)
+        future = self.inflight.get(flight_key)
+        if future is None:
+            stats["queries"] += 1
+            future = asyncio.ensure_future(fetch())
+            self.inflight[flight_key] = future
+            # Dropped once the query finishes rather than when the leader returns, so a
+            # leader whose client disconnects doesn't make later arrivals query again
+            future.add_done_callback(lambda _: self.inflight.pop(flight_key, None))
+        else:
+            stats["collapsed"] += 1
+        # shield: one cancelled caller must not cancel the query the others are waiting on
+        return await asyncio.shield(future)
+
+    def snapshot(self) -> dict:
+        return {"enabled": self.enabled, "inFlight": len(self.inflight), "handlers": self.stats}
+
+single_flight = SingleFlight(READ_COALESCING)
+
 # ==================== AUTH ROUTES ====================
 
-@api_router.post("/auth/signup", response_model=TokenResponse)
+@api_router.post("/auth/signup", response_model=TokenResponse, dependencies=[Depends(rate_limit("signup"))])
 async def signup(user_data: UserCreate):
     # Verify secret code
     if user_data.secretCode != ADMIN_SECRET_CODE:
@@ -280,7 +939,6 @@ async def signup(user_data: UserCreate):
     )
     user_dict = user_obj.model_dump()
     user_dict["password"] = get_password_hash(user_data.password)
-    user_dict["createdAt"] = user_dict["createdAt"].isoformat()
     
     await db.users.insert_one(user_dict)
     
@@ -293,7 +951,7 @@ async def signup(user_data: UserCreate):
         user=user_obj
     )
 
-@api_router.post("/auth/login", response_model=TokenResponse)
+@api_router.post("/auth/login", response_model=TokenResponse, dependencies=[Depends(rate_limit("login"))])
 async def login(user_data: UserLogin):
     # Verify secret code
     if user_data.secretCode != ADMIN_SECRET_CODE:
@@ -330,13 +988,15 @@ async def get_me(current_user: dict = Depends(get_current_user)):
 # ==================== PAGE CONTENT ROUTES ====================
 
 @api_router.get("/pages")
-async def get_all_pages():
-    pages = await db.pages.find({}, {"_id": 0}).to_list(100)
+async def get_all_pages(read_db=Depends(get_read_db)):
+    pages = await read_db.pages.find({}, {"_id": 0}).to_list(100)
     return pages
 
 @api_router.get("/pages/{page_id}")
-async def get_page(page_id: str):
-    page = await db.pages.find_one({"pageId": page_id}, {"_id": 0})
+async def get_page(page_id: str, read_db=Depends(get_read_db)):
+    page = await single_flight.run(
+        "get_page", (page_id, read_db is db), lambda: read_db.pages.find_one({"pageId": page_id}, {"_id": 0})
+    )
     if not page:
         # Return default content
         return {
@@ -345,79 +1005,231 @@ async def get_page(page_id: str):
             "heroSubtitle": "",
             "heroDescription": "",
             "heroImage": "",
-            "sections": []
+            "sections": [],
+            "version": 0
         }
     return page
 
 @api_router.post("/pages")
 async def create_or_update_page(page_data: PageContentCreate, current_user: dict = Depends(get_current_user)):
-    existing = await db.pages.find_one({"pageId": page_data.pageId})
-    
     page_dict = page_data.model_dump()
-    page_dict["updatedAt"] = datetime.now(timezone.utc).isoformat()
+    page_dict["updatedAt"] = datetime.now(timezone.utc)
     
-    if existing:
-        await db.pages.update_one({"pageId": page_data.pageId}, {"$set": page_dict})
-    else:
-        page_dict["id"] = str(uuid.uuid4())
-        await db.pages.insert_one(page_dict)
+    await db.pages.update_one(
+        {"pageId": page_data.pageId},
+        {"$set": page_dict, "$setOnInsert": {"id": str(uuid.uuid4())}, "$inc": {"version": 1}},
+        upsert=True
+    )
     
+    await refresh_snapshots("pages", page_data.pageId)
     return {"success": True}
 
+PATCHABLE_PAGE_FIELDS = {"heroTitle", "heroSubtitle", "heroDescription", "heroImage"}
+
+def check_patch_keys(data: dict):
+    for key in data:
+        if not key or key.startswith("$") or "." in key or key == "id":
+            raise HTTPException(status_code=400, detail=f"Invalid field: {key}")
+
+def page_filter(page_id: str, version: Optional[int]) -> dict:
+    query = {"pageId": page_id}
+    if version is not None:
+        # Pages written before versioning have no field; treat that as version 0
+        query["version"] = {"$in": [0, None]} if version == 0 else version
+    return query
+
+async def page_conflict(page_id: str, version: Optional[int]):
+    current = await db.pages.find_one({"pageId": page_id}, {"_id": 0, "version": 1})
+    if current is not None and version is not None and current.get("version", 0) != version:
+        raise HTTPException(status_code=409, detail={"message": "Page was modified by someone else", "version": current.get("version", 0)})
+
+async def apply_page_patch(page_id: str, version: Optional[int], update, upsert: bool, match: Optional[dict] = None, **kwargs) -> dict:
+    # Only a caller expecting no page yet may create one; an upsert would otherwise copy a
+    # non-zero expected version from the filter onto the new page
+    upsert = upsert and not version
+    try:
+        page = await db.pages.find_one_and_update(
+            {**page_filter(page_id, version), **(match or {})},
+            update,
+            upsert=upsert,
+            projection={"_id": 0, "version": 1},
+            return_document=ReturnDocument.AFTER,
+            **kwargs
+        )
+    except DuplicateKeyError:
+        # The version filter missed an existing page, so the upsert tried to create a second one
+        page = None
+    if page is None:
+        await page_conflict(page_id, version)
+        raise HTTPException(status_code=404, detail="Page, section or item not found")
+    await refresh_snapshots("pages", page_id)
+    return {"success": True, "version": page["version"]}
+
+@api_router.patch("/pages/{page_id}")
+async def patch_page(page_id: str, patch: PagePatch, current_user: dict = Depends(get_current_user)):
+    """Update hero fields only, leaving sections untouched"""
+    unknown = set(patch.data) - PATCHABLE_PAGE_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Invalid field: {', '.join(sorted(unknown))}")
+    update = {
+        "$set": {**patch.data, "updatedAt": datetime.now(timezone.utc)},
+        "$setOnInsert": {"id": str(uuid.uuid4()), "sections": []},
+        "$inc": {"version": 1}
+    }
+    return await apply_page_patch(page_id, patch.version, update, upsert=True)
+
+@api_router.patch("/pages/{page_id}/sections/{section_id}")
+async def patch_page_section(page_id: str, section_id: str, patch: PagePatch, current_user: dict = Depends(get_current_user)):
+    """Merge fields into one section by id, appending the section (and creating the page) if missing"""
+    check_patch_keys(patch.data)
+    fields = {key: {"$literal": value} for key, value in patch.data.items()}
+    sections = {"$ifNull": ["$sections", []]}
+    # Pipeline update: one round trip that works whether or not the page or section exists yet
+    update = [{"$set": {
+        "sections": {"$cond": [
+            {"$in": [section_id, {"$ifNull": ["$sections.id", []]}]},
+            {"$map": {"input": sections, "as": "s", "in": {"$cond": [
+                {"$eq": ["$$s.id", section_id]},
+                {"$mergeObjects": ["$$s", fields]},
+                "$$s"
+            ]}}},
+            {"$concatArrays": [sections, [{"$mergeObjects": [{"id": section_id}, fields]}]]}
+        ]},
+        "id": {"$ifNull": ["$id", str(uuid.uuid4())]},
+        "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+        "updatedAt": datetime.now(timezone.utc)
+    }}]
+    return await apply_page_patch(page_id, patch.version, update, upsert=True)
+
+@api_router.patch("/pages/{page_id}/sections/{section_id}/items/{item_key}")
+async def patch_page_section_item(page_id: str, section_id: str, item_key: str, patch: PageItemPatch, current_user: dict = Depends(get_current_user)):
+    """Update one item of a section, addressed by its id or, for plain string items, its index"""
+    if item_key.isdigit():
+        # Items such as mission bullets are bare strings; replace by position
+        match = {"id": section_id, f"items.{item_key}": {"$exists": True}}
+        update = {"$set": {f"sections.$[s].items.{item_key}": patch.value}}
+        array_filters = [{"s.id": section_id}]
+    else:
+        if not isinstance(patch.value, dict):
+            raise HTTPException(status_code=400, detail="Items addressed by id take an object of fields")
+        check_patch_keys(patch.value)
+        match = {"id": section_id, "items.id": item_key}
+        update = {"$set": {f"sections.$[s].items.$[i].{key}": value for key, value in patch.value.items()}}
+        array_filters = [{"s.id": section_id}, {"i.id": item_key}]
+    update["$set"]["updatedAt"] = datetime.now(timezone.utc)
+    update["$inc"] = {"version": 1}
+    return await apply_page_patch(
+        page_id, patch.version, update, upsert=False,
+        match={"sections": {"$elemMatch": match}}, array_filters=array_filters
+    )
+
 # ==================== ARTICLE ROUTES ====================
 
 @api_router.get("/articles")
-async def get_articles():
-    articles = await db.articles.find({}, {"_id": 0}).sort("createdAt", -1).to_list(100)
+async def get_articles(
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None,
+    tag: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    read_db=Depends(get_read_db)
+):
+    query = {}
+    if from_ or to:
+        query["createdAt"] = date_range_filter(from_, to)
+    if tag:
+        query["tags"] = tag
+    articles = await read_db.articles.find(query, {"_id": 0}).sort("createdAt", -1).skip(skip).to_list(limit)
     return articles
 
+# Tag cloud: counted by aggregation only when articles change, then served from memory
+TAG_CACHE_SECONDS = float(os.environ.get('TAG_CACHE_SECONDS', '60'))
+tag_cache = {"expires": 0.0, "tags": None}
+
+async def refresh_tag_counts():
+    pipeline = [
+        {"$unwind": "$tags"},
+        {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1, "_id": 1}}
+    ]
+    tags = [{"tag": t["_id"], "count": t["count"]} async for t in db.articles.aggregate(pipeline)]
+    # Stored so other workers pick up the new counts without re-aggregating
+    await db.settings.update_one(
+        {"key": "tag_counts"},
+        {"$set": {"key": "tag_counts", "value": tags, "updatedAt": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    tag_cache.update(expires=time.monotonic() + TAG_CACHE_SECONDS, tags=tags)
+
+async def get_tag_counts() -> List[dict]:
+    if tag_cache["tags"] is not None and tag_cache["expires"] > time.monotonic():
+        return tag_cache["tags"]
+    stored = await public_db.settings.find_one({"key": "tag_counts"}, {"_id": 0, "value": 1})
+    if stored is None:
+        await refresh_tag_counts()
+    else:
+        tag_cache.update(expires=time.monotonic() + TAG_CACHE_SECONDS, tags=stored["value"])
+    return tag_cache["tags"]
+
+@api_router.get("/tags")
+async def get_tags():
+    """Article tags with how many articles use each, most used first"""
+    return await get_tag_counts()
+
 @api_router.get("/articles/{slug}")
-async def get_article(slug: str):
-    article = await db.articles.find_one({"slug": slug}, {"_id": 0})
+async def get_article(slug: str, read_db=Depends(get_read_db)):
+    article = await single_flight.run(
+        "get_article", (slug, read_db is db), lambda: read_db.articles.find_one({"slug": slug}, {"_id": 0})
+    )
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
+    view_counter.record("articles", article["id"])
     return article
 
 @api_router.post("/articles")
 async def create_article(article_data: ArticleCreate, current_user: dict = Depends(get_current_user)):
     article_obj = Article(**article_data.model_dump())
     article_dict = article_obj.model_dump()
-    article_dict["createdAt"] = article_dict["createdAt"].isoformat()
-    article_dict["updatedAt"] = article_dict["updatedAt"].isoformat()
     await db.articles.insert_one(article_dict)
     article_dict.pop("_id", None)
+    await refresh_tag_counts()
+    await refresh_snapshots("articles", article_dict["slug"])
     return article_dict
 
 @api_router.put("/articles/{article_id}")
 async def update_article(article_id: str, article_data: ArticleCreate, current_user: dict = Depends(get_current_user)):
     update_dict = article_data.model_dump()
-    update_dict["updatedAt"] = datetime.now(timezone.utc).isoformat()
-    result = await db.articles.update_one({"id": article_id}, {"$set": update_dict})
-    if result.modified_count == 0:
+    update_dict["updatedAt"] = datetime.now(timezone.utc)
+    previous = await db.articles.find_one_and_update({"id": article_id}, {"$set": update_dict}, projection={"_id": 0, "slug": 1})
+    if previous is None:
         raise HTTPException(status_code=404, detail="Article not found")
+    await refresh_tag_counts()
+    await refresh_snapshots("articles", previous["slug"], update_dict["slug"])
     return {"success": True}
 
 @api_router.delete("/articles/{article_id}")
 async def delete_article(article_id: str, current_user: dict = Depends(get_current_user)):
-    result = await db.articles.delete_one({"id": article_id})
-    if result.deleted_count == 0:
+    deleted = await db.articles.find_one_and_delete({"id": article_id}, projection={"_id": 0, "slug": 1})
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Article not found")
+    await refresh_tag_counts()
+    await refresh_snapshots("articles", deleted["slug"])
     return {"success": True}
 
 # ==================== MEDIA ROUTES ====================
 
 @api_router.get("/media")
-async def get_media():
-    media = await db.media.find({}, {"_id": 0}).sort("createdAt", -1).to_list(100)
+async def get_media(read_db=Depends(get_read_db)):
+    media = await read_db.media.find({}, {"_id": 0}).sort("createdAt", -1).to_list(100)
     return media
 
 @api_router.post("/media")
 async def create_media(media_data: MediaCreate, current_user: dict = Depends(get_current_user)):
     media_obj = Media(**media_data.model_dump())
     media_dict = media_obj.model_dump()
-    media_dict["createdAt"] = media_dict["createdAt"].isoformat()
     await db.media.insert_one(media_dict)
     media_dict.pop("_id", None)
+    await refresh_snapshots("media")
     return media_dict
 
 @api_router.put("/media/{media_id}")
@@ -426,6 +1238,7 @@ async def update_media(media_id: str, media_data: MediaCreate, current_user: dic
     result = await db.media.update_one({"id": media_id}, {"$set": update_dict})
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Media not found")
+    await refresh_snapshots("media")
     return {"success": True}
 
 @api_router.delete("/media/{media_id}")
@@ -433,21 +1246,26 @@ async def delete_media(media_id: str, current_user: dict = Depends(get_current_u
     result = await db.media.delete_one({"id": media_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Media not found")
+    await refresh_snapshots("media")
     return {"success": True}
 
 # ==================== DOCUMENT ROUTES (Documentation, Activity, Report) ====================
 
 @api_router.get("/documents")
-async def get_documents(doc_type: Optional[str] = None):
+async def get_documents(doc_type: Optional[str] = None, from_: Optional[str] = Query(None, alias="from"), to: Optional[str] = None, read_db=Depends(get_read_db)):
     query = {}
     if doc_type:
         query["docType"] = doc_type
-    documents = await db.documents.find(query, {"_id": 0}).sort("createdAt", -1).to_list(100)
+    if from_ or to:
+        query["createdAt"] = date_range_filter(from_, to)
+    documents = await read_db.documents.find(query, {"_id": 0}).sort("createdAt", -1).to_list(100)
     return documents
 
 @api_router.get("/documents/{slug}")
-async def get_document(slug: str):
-    doc = await db.documents.find_one({"slug": slug}, {"_id": 0})
+async def get_document(slug: str, read_db=Depends(get_read_db)):
+    doc = await single_flight.run(
+        "get_document", (slug, read_db is db), lambda: read_db.documents.find_one({"slug": slug}, {"_id": 0})
+    )
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
     return doc
@@ -456,10 +1274,9 @@ async def get_document(slug: str):
 async def create_document(doc_data: DocumentCreate, current_user: dict = Depends(get_current_user)):
     doc_obj = Document(**doc_data.model_dump())
     doc_dict = doc_obj.model_dump()
-    doc_dict["createdAt"] = doc_dict["createdAt"].isoformat()
-    doc_dict["updatedAt"] = doc_dict["updatedAt"].isoformat()
     await db.documents.insert_one(doc_dict)
     doc_dict.pop("_id", None)
+    await refresh_snapshots("documents", doc_dict["slug"])
     return doc_dict
     await db.documents.insert_one(doc_dict)
     return doc_dict
@@ -467,73 +1284,302 @@ async def create_document(doc_data: DocumentCreate, current_user: dict = Depends
 @api_router.put("/documents/{doc_id}")
 async def update_document(doc_id: str, doc_data: DocumentCreate, current_user: dict = Depends(get_current_user)):
     update_dict = doc_data.model_dump()
-    update_dict["updatedAt"] = datetime.now(timezone.utc).isoformat()
-    result = await db.documents.update_one({"id": doc_id}, {"$set": update_dict})
-    if result.modified_count == 0:
+    update_dict["updatedAt"] = datetime.now(timezone.utc)
+    previous = await db.documents.find_one_and_update({"id": doc_id}, {"$set": update_dict}, projection={"_id": 0, "slug": 1})
+    if previous is None:
         raise HTTPException(status_code=404, detail="Document not found")
+    await refresh_snapshots("documents", previous["slug"], update_dict["slug"])
     return {"success": True}
 
 @api_router.delete("/documents/{doc_id}")
 async def delete_document(doc_id: str, current_user: dict = Depends(get_current_user)):
-    result = await db.documents.delete_one({"id": doc_id})
-    if result.deleted_count == 0:
+    deleted = await db.documents.find_one_and_delete({"id": doc_id}, projection={"_id": 0, "slug": 1})
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Document not found")
+    await refresh_snapshots("documents", deleted["slug"])
     return {"success": True}
 
 # ==================== EVENT ROUTES ====================
 
 @api_router.get("/events")
-async def get_events():
-    events = await db.events.find({}, {"_id": 0}).sort("date", -1).to_list(100)
+async def get_events(
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None,
+    upcoming: bool = False,
+    limit: int = Query(100, ge=1, le=100),
+    read_db=Depends(get_read_db)
+):
+    query = {}
+    if from_ or to:
+        query["startsAt"] = date_range_filter(from_, to, EVENT_TIMEZONE)
+    if upcoming:
+        # Soonest first: a bounded range scan on the startsAt index
+        now = datetime.now(timezone.utc)
+        start = query.get("startsAt", {}).get("$gte")
+        query.setdefault("startsAt", {})["$gte"] = max(start, now) if start else now
+        cursor = read_db.events.find(query, {"_id": 0}).sort("startsAt", 1)
+    else:
+        cursor = read_db.events.find(query, {"_id": 0}).sort("startsAt", -1)
+    events = await cursor.to_list(limit)
     return events
 
 @api_router.get("/events/{slug}")
-async def get_event(slug: str):
-    event = await db.events.find_one({"slug": slug}, {"_id": 0})
+async def get_event(slug: str, read_db=Depends(get_read_db)):
+    event = await single_flight.run(
+        "get_event", (slug, read_db is db), lambda: read_db.events.find_one({"slug": slug}, {"_id": 0})
+    )
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
+    view_counter.record("events", event["id"])
     return event
 
 @api_router.post("/events")
 async def create_event(event_data: EventCreate, current_user: dict = Depends(get_current_user)):
-    event_obj = Event(**event_data.model_dump())
+    event_obj = Event(**event_data.model_dump(), startsAt=parse_event_date(event_data.date, event_data.time))
     event_dict = event_obj.model_dump()
-    event_dict["createdAt"] = event_dict["createdAt"].isoformat()
-    event_dict["updatedAt"] = event_dict["updatedAt"].isoformat()
     await db.events.insert_one(event_dict)
     event_dict.pop("_id", None)
+    await refresh_snapshots("events", event_dict["slug"])
     return event_dict
 
 @api_router.put("/events/{event_id}")
 async def update_event(event_id: str, event_data: EventCreate, current_user: dict = Depends(get_current_user)):
     update_dict = event_data.model_dump()
-    update_dict["updatedAt"] = datetime.now(timezone.utc).isoformat()
-    result = await db.events.update_one({"id": event_id}, {"$set": update_dict})
-    if result.modified_count == 0:
+    update_dict["startsAt"] = parse_event_date(event_data.date, event_data.time)
+    update_dict["updatedAt"] = datetime.now(timezone.utc)
+    previous = await db.events.find_one_and_update({"id": event_id}, {"$set": update_dict}, projection={"_id": 0, "slug": 1})
+    if previous is None:
         raise HTTPException(status_code=404, detail="Event not found")
+    await refresh_snapshots("events", previous["slug"], update_dict["slug"])
     return {"success": True}
 
 @api_router.delete("/events/{event_id}")
 async def delete_event(event_id: str, current_user: dict = Depends(get_current_user)):
-    result = await db.events.delete_one({"id": event_id})
-    if result.deleted_count == 0:
+    deleted = await db.events.find_one_and_delete({"id": event_id}, projection={"_id": 0, "slug": 1})
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Event not found")
+    await refresh_snapshots("events", deleted["slug"])
     return {"success": True}
 
 # ==================== EVENT REGISTRATION ROUTES ====================
 
-@api_router.post("/events/{event_id}/register")
-async def register_event(event_id: str, reg_data: EventRegistrationCreate):
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '600'))
+IDEMPOTENCY_CACHE_SIZE = 10000
+
+# Recent registration results by idempotency key and by event+email: key -> (expires, future)
+idempotency_cache = OrderedDict()
+
+def idempotency_lookup(key: str):
+    entry = idempotency_cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+def idempotency_forget(keys: List[str], future):
+    for key in keys:
+        entry = idempotency_cache.get(key)
+        if entry and entry[1] is future:
+            del idempotency_cache[key]
+
+# Group commit: when enabled, registrations are queued and upserted in unordered bulk writes
+REGISTRATION_BATCHING = os.environ.get('REGISTRATION_BATCHING', 'false').lower() == 'true'
+REGISTRATION_BATCH_SIZE = int(os.environ.get('REGISTRATION_BATCH_SIZE', '100'))
+REGISTRATION_BATCH_DELAY_MS = float(os.environ.get('REGISTRATION_BATCH_DELAY_MS', '5'))
+
+class RegistrationWriteBuffer:
+    """Coalesces concurrent registrations into one bulk_write per batch
+
+    Each caller still gets its own result: the id of the registration it
+    created, or of the existing one for the same event+email.
+    """
+
+    def __init__(self, max_batch: int, max_delay: float):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pending = []
+        self.timer = None
+        self.flushes = set()
+
+    async def submit(self, reg_dict: dict) -> str:
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((reg_dict, future))
+        if len(self.pending) >= self.max_batch:
+            self.start_flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.max_delay, self.start_flush)
+        return await future
+
+    def start_flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        task = asyncio.ensure_future(self.flush(batch))
+        self.flushes.add(task)
+        task.add_done_callback(self.flushes.discard)
+
+    async def flush(self, batch: List[tuple]):
+        ops = [
+            UpdateOne({"eventId": reg["eventId"], "email": reg["email"]}, {"$setOnInsert": reg}, upsert=True)
+            for reg, _ in batch
+        ]
+        errors = {}
+        try:
+            result = await db.registrations.bulk_write(ops, ordered=False)
+            upserted = result.upserted_ids
+        except BulkWriteError as e:
+            errors = {err["index"]: err for err in e.details["writeErrors"]}
+            upserted = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # Ops that matched an existing row (or lost a duplicate-key race) resolve to that row's id
+        lookups = []
+        for index, (reg, future) in enumerate(batch):
+            error = errors.get(index)
+            if future.done():
+                continue
+            if index in upserted:
+                future.set_result(reg["id"])
+            elif error and error.get("code") != 11000:
+                future.set_exception(WriteError(error.get("errmsg"), error.get("code"), error))
+            else:
+                lookups.append((reg, future))
+        if not lookups:
+            return
+        try:
+            query = {"$or": [{"eventId": reg["eventId"], "email": reg["email"]} for reg, _ in lookups]}
+            existing = {
+                (r["eventId"], r["email"]): r["id"]
+                async for r in db.registrations.find(query, {"_id": 0, "id": 1, "eventId": 1, "email": 1})
+            }
+        except Exception as e:
+            existing, lookup_error = {}, e
+        else:
+            lookup_error = RuntimeError("Registration not found after upsert")
+        for reg, future in lookups:
+            registration_id = existing.get((reg["eventId"], reg["email"]))
+            if future.done():
+                continue
+            if registration_id:
+                future.set_result(registration_id)
+            else:
+                future.set_exception(lookup_error)
+
+    async def close(self):
+        """Flush whatever is queued and wait for in-flight batches"""
+        self.start_flush()
+        if self.flushes:
+            await asyncio.gather(*self.flushes, return_exceptions=True)
+
+registration_buffer = RegistrationWriteBuffer(REGISTRATION_BATCH_SIZE, REGISTRATION_BATCH_DELAY_MS / 1000) if REGISTRATION_BATCHING else None
+
+async def dedupe_registrations() -> dict:
+    """Normalise stored emails and drop repeat (eventId, email) rows so event_email_unique can be built
+
+    The earliest registration of each pair is kept; the others are copied to
+    registration_duplicates before being deleted.
+    """
+    normalized = removed = 0
+    async for reg in db.registrations.find({"email": {"$type": "string"}}, {"_id": 1, "email": 1}):
+        email = reg["email"].strip().lower()
+        if email == reg["email"]:
+            continue
+        try:
+            await db.registrations.update_one({"_id": reg["_id"]}, {"$set": {"email": email}})
+            normalized += 1
+        except DuplicateKeyError:
+            # The index already exists and holds the normalised address: this row is a repeat
+            duplicate = await db.registrations.find_one({"_id": reg["_id"]})
+            await db.registration_duplicates.insert_one(duplicate)
+            await db.registrations.delete_one({"_id": reg["_id"]})
+            removed += 1
+    pipeline = [
+        {"$sort": {"createdAt": 1}},
+        {"$group": {"_id": {"eventId": "$eventId", "email": "$email"}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+    async for group in db.registrations.aggregate(pipeline, allowDiskUse=True):
+        repeats = group["ids"][1:]
+        duplicates = await db.registrations.find({"_id": {"$in": repeats}}).to_list(None)
+        if duplicates:
+            await db.registration_duplicates.insert_many(duplicates)
+        result = await db.registrations.delete_many({"_id": {"$in": repeats}})
+        removed += result.deleted_count
+    return {"normalized": normalized, "removed": removed}
+
+async def save_registration(event_id: str, reg_data: EventRegistrationCreate, email: str) -> dict:
     # Check event exists
-    event = await db.events.find_one({"id": event_id})
+    event = await db.events.find_one({"id": event_id}, {"_id": 0, "id": 1})
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    reg_obj = EventRegistration(eventId=event_id, **{k: v for k, v in reg_data.model_dump().items() if k != 'eventId'})
+    reg_obj = EventRegistration(eventId=event_id, **{k: v for k, v in reg_data.model_dump().items() if k not in ('eventId', 'email')}, email=email)
     reg_dict = reg_obj.model_dump()
-    reg_dict["createdAt"] = reg_dict["createdAt"].isoformat()
-    await db.registrations.insert_one(reg_dict)
-    return {"success": True, "message": "Pendaftaran berhasil!"}
+    if registration_buffer:
+        registration_id = await registration_buffer.submit(reg_dict)
+        return {"success": True, "message": "Pendaftaran berhasil!", "registrationId": registration_id}
+    # Upsert so a repeat for the same event+email returns the original row instead of a new one
+    try:
+        existing = await db.registrations.find_one_and_update(
+            {"eventId": event_id, "email": email},
+            {"$setOnInsert": reg_dict},
+            upsert=True,
+            projection={"_id": 0, "id": 1},
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Lost a race with a concurrent upsert from another worker; that row is the original
+        existing = await db.registrations.find_one({"eventId": event_id, "email": email}, {"_id": 0, "id": 1})
+    return {"success": True, "message": "Pendaftaran berhasil!", "registrationId": existing["id"]}
+
+@api_router.post("/events/{event_id}/register", dependencies=[Depends(rate_limit("register"))])
+async def register_event(event_id: str, reg_data: EventRegistrationCreate, idempotency_key: Optional[str] = Header(None)):
+    email = reg_data.email.strip().lower()
+    keys = [f"{event_id}:email:{email}"]
+    if idempotency_key:
+        keys.append(f"{event_id}:key:{idempotency_key}")
+    
+    # Retries (and retries still in flight) share the first attempt's result without touching Mongo
+    while True:
+        pending = next((p for p in map(idempotency_lookup, keys) if p is not None), None)
+        if pending is None:
+            break
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise
+            # The first attempt's client went away mid-write; the upsert is idempotent, so the
+            # first waiter to wake takes over (no await before it re-registers) and the rest wait on it
+    
+    future = asyncio.get_running_loop().create_future()
+    expires = time.monotonic() + IDEMPOTENCY_TTL_SECONDS
+    for key in keys:
+        idempotency_cache[key] = (expires, future)
+        idempotency_cache.move_to_end(key)
+    while len(idempotency_cache) > IDEMPOTENCY_CACHE_SIZE:
+        idempotency_cache.popitem(last=False)
+    
+    try:
+        result = await save_registration(event_id, reg_data, email)
+    except asyncio.CancelledError:
+        idempotency_forget(keys, future)
+        future.cancel()
+        raise
+    except Exception as e:
+        # Failures are not cached: waiting retries see the error, later ones try again
+        idempotency_forget(keys, future)
+        future.set_exception(e)
+        future.exception()
+        raise
+    future.set_result(result)
+    return result
 
 @api_router.get("/events/{event_id}/registrations")
 async def get_event_registrations(event_id: str, current_user: dict = Depends(get_current_user)):
@@ -545,6 +1591,97 @@ async def export_registrations(event_id: str, current_user: dict = Depends(get_c
     regs = await db.registrations.find({"eventId": event_id}, {"_id": 0}).to_list(1000)
     return regs
 
+# ==================== VIEW COUNTS ====================
+
+# Views are counted in memory and written as one bulk $inc per flush; a crash loses
+# at most VIEW_FLUSH_SECONDS or VIEW_FLUSH_MAX_PENDING views, whichever comes first
+VIEW_FLUSH_SECONDS = float(os.environ.get('VIEW_FLUSH_SECONDS', '10'))
+VIEW_FLUSH_MAX_PENDING = int(os.environ.get('VIEW_FLUSH_MAX_PENDING', '1000'))
+POPULAR_CACHE_SECONDS = float(os.environ.get('POPULAR_CACHE_SECONDS', '60'))
+
+class ViewCounter:
+    def __init__(self, interval: float, max_pending: int):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.counts = Counter()
+        self.pending = 0
+        self.task = None
+        self.flushing = None
+
+    def record(self, collection: str, doc_id: str):
+        self.counts[(collection, doc_id)] += 1
+        self.pending += 1
+        if self.pending >= self.max_pending:
+            self.flush_soon()
+
+    def flush_soon(self):
+        # At most one flush in flight; it runs as its own task so stop() can't cut it off mid-write
+        if self.flushing is None:
+            self.flushing = asyncio.ensure_future(self.flush())
+        return self.flushing
+
+    def start(self):
+        self.task = asyncio.ensure_future(self.run())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.shield(self.flush_soon())
+
+    async def flush(self):
+        try:
+            if not self.counts:
+                return
+            counts, self.counts, self.pending = self.counts, Counter(), 0
+            ops = [
+                UpdateOne({"collection": collection, "docId": doc_id}, {"$inc": {"views": views}}, upsert=True)
+                for (collection, doc_id), views in counts.items()
+            ]
+            try:
+                await db.view_counts.bulk_write(ops, ordered=False)
+            except Exception as e:
+                # Keep the increments for the next flush rather than dropping them
+                logger.warning("Flushing %d view counters failed: %s", len(ops), e)
+                self.counts.update(counts)
+                self.pending += sum(counts.values())
+        finally:
+            if self.flushing is asyncio.current_task():
+                self.flushing = None
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+        if self.flushing:
+            await self.flushing
+        await self.flush()
+
+view_counter = ViewCounter(VIEW_FLUSH_SECONDS, VIEW_FLUSH_MAX_PENDING)
+
+# (kind, limit) -> (expires, items)
+popular_cache = {}
+
+POPULAR_PROJECTIONS = {
+    "articles": {"_id": 0, "content": 0},
+    "events": {"_id": 0, "description": 0},
+}
+
+@api_router.get("/popular/{kind}")
+async def get_popular(kind: str, limit: int = 5):
+    """Most viewed articles or events, from the flushed view counts"""
+    if kind not in POPULAR_PROJECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown kind")
+    limit = min(max(limit, 1), 50)
+    cached = popular_cache.get((kind, limit))
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    
+    counts = await public_db.view_counts.find({"collection": kind}, {"_id": 0, "docId": 1, "views": 1}).sort("views", -1).to_list(limit)
+    views = {c["docId"]: c["views"] for c in counts}
+    docs = await public_db[kind].find({"id": {"$in": list(views)}}, POPULAR_PROJECTIONS[kind]).to_list(limit)
+    items = sorted(({**doc, "views": views[doc["id"]]} for doc in docs), key=lambda d: d["views"], reverse=True)
+    popular_cache[(kind, limit)] = (time.monotonic() + POPULAR_CACHE_SECONDS, items)
+    return items
+
 # ==================== TASK ROUTES (AI Personal Agent) ====================
 
 @api_router.get("/tasks")
@@ -561,8 +1698,6 @@ async def get_tasks(status: Optional[str] = None, assignee: Optional[str] = None
 async def create_task(task_data: TaskCreate, current_user: dict = Depends(get_current_user)):
     task_obj = Task(**task_data.model_dump())
     task_dict = task_obj.model_dump()
-    task_dict["createdAt"] = task_dict["createdAt"].isoformat()
-    task_dict["updatedAt"] = task_dict["updatedAt"].isoformat()
     await db.tasks.insert_one(task_dict)
     task_dict.pop("_id", None)
     return task_dict
@@ -570,7 +1705,7 @@ async def create_task(task_data: TaskCreate, current_user: dict = Depends(get_cu
 @api_router.put("/tasks/{task_id}")
 async def update_task(task_id: str, task_data: TaskCreate, current_user: dict = Depends(get_current_user)):
     update_dict = task_data.model_dump()
-    update_dict["updatedAt"] = datetime.now(timezone.utc).isoformat()
+    update_dict["updatedAt"] = datetime.now(timezone.utc)
     result = await db.tasks.update_one({"id": task_id}, {"$set": update_dict})
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Task not found")
@@ -612,8 +1747,8 @@ async def ai_agent(input_data: dict, current_user: dict = Depends(get_current_us
 # ==================== MEMBER ROUTES (for Galaxy effect) ====================
 
 @api_router.get("/members")
-async def get_members():
-    members = await db.members.find({}, {"_id": 0}).to_list(200)
+async def get_members(read_db=Depends(get_read_db)):
+    members = await read_db.members.find({}, {"_id": 0}).to_list(200)
     return members
 
 # Member model for JSON input
@@ -622,12 +1757,97 @@ class MemberCreate(BaseModel):
     position: Optional[str] = ""
     division: Optional[str] = ""
 
+# Galaxy layout: star positions are computed server-side once per membership change
+GALAXY_LAYERS = 3
+GALAXY_FIELDS = ["id", "name", "position", "x", "y", "layer"]
+
+# Last layout this worker has loaded, keyed by its ETag
+galaxy_cache = {"etag": None, "body": None}
+
+def star_hash(member_id: str):
+    """Three stable pseudo-random floats in [0, 1) derived from the member id"""
+    digest = hashlib.sha1(member_id.encode()).digest()
+    return [int.from_bytes(digest[i:i + 4], "big") / 2 ** 32 for i in (0, 4, 8)]
+
+def compute_galaxy_layout(members: List[dict]) -> dict:
+    divisions = {}
+    for member in sorted(members, key=lambda m: m["id"]):
+        divisions.setdefault(member.get("division") or "", []).append(member)
+
+    names = sorted(divisions)
+    clusters = []
+    for index, name in enumerate(names):
+        # Division clusters sit on a ring around the centre; a single division takes the middle
+        angle = 2 * math.pi * index / len(names)
+        ring = 0.3 if len(names) > 1 else 0.0
+        cx, cy = 0.5 + ring * math.cos(angle), 0.5 + ring * math.sin(angle)
+        spread = min(0.18, 0.04 + 0.01 * math.sqrt(len(divisions[name])))
+        stars = []
+        for member in divisions[name]:
+            r, theta, depth = star_hash(member["id"])
+            # sqrt keeps the density uniform across the cluster's disc
+            x = cx + spread * math.sqrt(r) * math.cos(2 * math.pi * theta)
+            y = cy + spread * math.sqrt(r) * math.sin(2 * math.pi * theta)
+            stars.append([
+                member["id"],
+                member.get("name", ""),
+                member.get("position") or "",
+                round(min(max(x, 0.0), 1.0), 4),
+                round(min(max(y, 0.0), 1.0), 4),
+                int(depth * GALAXY_LAYERS)
+            ])
+        clusters.append({"name": name, "cx": round(cx, 4), "cy": round(cy, 4), "stars": stars})
+
+    return {
+        "count": len(members),
+        "layers": GALAXY_LAYERS,
+        "fields": GALAXY_FIELDS,
+        "divisions": clusters
+    }
+
+async def refresh_galaxy_layout():
+    """Recompute the layout from all members and store it for every worker to pick up"""
+    projection = {"_id": 0, "id": 1, "name": 1, "position": 1, "division": 1}
+    members = [m async for m in db.members.find({}, projection)]
+    body = json.dumps(compute_galaxy_layout(members), separators=(",", ":"))
+    etag = '"%s"' % hashlib.sha1(body.encode()).hexdigest()
+    await db.settings.update_one(
+        {"key": "galaxy_layout"},
+        {"$set": {"key": "galaxy_layout", "etag": etag, "value": body, "updatedAt": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    galaxy_cache.update(etag=etag, body=body)
+    return etag, body
+
+async def get_galaxy_layout():
+    # Only the small ETag field is read per request; the body is reloaded when it changes.
+    # Read from the primary: a lagging secondary would hand back the previous ETag right after
+    # a refresh and put the old layout back into the cache (and the members/galaxy snapshot)
+    stored = await db.settings.find_one({"key": "galaxy_layout"}, {"_id": 0, "etag": 1})
+    if not stored:
+        return await refresh_galaxy_layout()
+    if stored["etag"] != galaxy_cache["etag"]:
+        stored = await db.settings.find_one({"key": "galaxy_layout"}, {"_id": 0, "etag": 1, "value": 1})
+        galaxy_cache.update(etag=stored["etag"], body=stored["value"])
+    return galaxy_cache["etag"], galaxy_cache["body"]
+
+@api_router.get("/members/galaxy")
+async def get_members_galaxy(request: Request):
+    """Precomputed Galaxy layout for the About page, grouped by division"""
+    etag, body = await get_galaxy_layout()
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @api_router.post("/members")
 async def create_member(member_data: MemberCreate, current_user: dict = Depends(get_current_user)):
     member = Member(**member_data.model_dump())
     member_dict = member.model_dump()
     await db.members.insert_one(member_dict)
     member_dict.pop("_id", None)
+    await refresh_galaxy_layout()
+    await refresh_snapshots("members")
     return member_dict
 
 @api_router.put("/members/{member_id}")
@@ -636,6 +1856,8 @@ async def update_member(member_id: str, member_data: MemberCreate, current_user:
     result = await db.members.update_one({"id": member_id}, {"$set": update_dict})
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Member not found")
+    await refresh_galaxy_layout()
+    await refresh_snapshots("members")
     return {"success": True}
 
 @api_router.delete("/members/{member_id}")
@@ -643,30 +1865,478 @@ async def delete_member(member_id: str, current_user: dict = Depends(get_current
     result = await db.members.delete_one({"id": member_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Member not found")
+    await refresh_galaxy_layout()
+    await refresh_snapshots("members")
     return {"success": True}
 
 # ==================== FILE UPLOAD ====================
 
+# "local" keeps files in UPLOAD_DIR; "s3" uses any S3-compatible store (AWS, MinIO, ...)
+UPLOAD_STORAGE = os.environ.get('UPLOAD_STORAGE', 'local')
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+PRESIGN_EXPIRES_SECONDS = int(os.environ.get('S3_PRESIGN_EXPIRES', '3600'))
+# Subdirectory (or key prefix) the upload collector moves unreferenced files into
+QUARANTINE_DIR = ".quarantine"
+
+class UploadStorage(ABC):
+    """Where uploaded files live; subclasses implement one backend"""
+
+    supports_presign = False
+
+    @abstractmethod
+    async def save(self, filename: str, file: UploadFile):
+        ...
+
+    @abstractmethod
+    async def serve(self, filename: str) -> Response:
+        ...
+
+    @abstractmethod
+    async def delete(self, filename: str, quarantined: bool = False):
+        ...
+
+    @abstractmethod
+    async def list_files(self, quarantined: bool = False) -> List[dict]:
+        """[{"filename", "size", "modified"}] for every stored (or quarantined) file, modified as a timestamp"""
+
+    @abstractmethod
+    async def quarantine(self, filename: str):
+        ...
+
+    @abstractmethod
+    async def restore(self, filename: str):
+        ...
+
+    async def presign_put(self, filename: str, content_type: str) -> str:
+        raise HTTPException(status_code=400, detail="Presigned uploads are not supported by this storage")
+
+    async def create_multipart(self, filename: str, content_type: str, parts: int) -> dict:
+        raise HTTPException(status_code=400, detail="Multipart uploads are not supported by this storage")
+
+    async def complete_multipart(self, filename: str, upload_id: str, parts: List[dict]):
+        raise HTTPException(status_code=400, detail="Multipart uploads are not supported by this storage")
+
+    async def abort_multipart(self, filename: str, upload_id: str):
+        raise HTTPException(status_code=400, detail="Multipart uploads are not supported by this storage")
+
+class LocalUploadStorage(UploadStorage):
+    def __init__(self, directory: Path):
+        import aiofiles
+        self.directory = directory
+        self.directory.mkdir(exist_ok=True)
+        self.open = aiofiles.open
+
+    async def save(self, filename: str, file: UploadFile):
+        # Stream in chunks so large media never sits in memory whole
+        async with self.open(self.directory / filename, 'wb') as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await f.write(chunk)
+
+    def has(self, filename: str) -> bool:
+        return (self.directory / filename).is_file()
+
+    async def serve(self, filename: str) -> Response:
+        if not self.has(filename):
+            raise HTTPException(status_code=404, detail="File not found")
+        return FileResponse(self.directory / filename)
+
+    def path(self, filename: str, quarantined: bool = False) -> Path:
+        return self.directory / QUARANTINE_DIR / filename if quarantined else self.directory / filename
+
+    async def delete(self, filename: str, quarantined: bool = False):
+        await asyncio.to_thread(self.path(filename, quarantined).unlink, True)
+
+    async def list_files(self, quarantined: bool = False) -> List[dict]:
+        directory = self.directory / QUARANTINE_DIR if quarantined else self.directory
+
+        def scan():
+            if not directory.is_dir():
+                return []
+            # scandir reuses the directory read for the type check, so only stat() hits the disk per file
+            with os.scandir(directory) as entries:
+                return [
+                    {"filename": entry.name, "size": stat.st_size, "modified": stat.st_mtime}
+                    for entry in entries
+                    if entry.is_file() and not entry.name.startswith(".")
+                    for stat in [entry.stat()]
+                ]
+
+        return await asyncio.to_thread(scan)
+
+    async def quarantine(self, filename: str):
+        def move():
+            target = self.path(filename, quarantined=True)
+            target.parent.mkdir(exist_ok=True)
+            os.replace(self.path(filename), target)
+            # Quarantine retention counts from now, not from the original upload
+            os.utime(target)
+
+        await asyncio.to_thread(move)
+
+    async def restore(self, filename: str):
+        await asyncio.to_thread(os.replace, self.path(filename, quarantined=True), self.path(filename))
+
+class S3UploadStorage(UploadStorage):
+    supports_presign = True
+
+    def __init__(self, fallback: Optional[LocalUploadStorage] = None):
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError:
+            raise RuntimeError("UPLOAD_STORAGE=s3 requires boto3 (pip install boto3)")
+        endpoint_url = os.environ.get('S3_ENDPOINT_URL') or None
+        self.bucket = os.environ['S3_BUCKET']
+        self.prefix = os.environ.get('S3_PREFIX', 'uploads/')
+        # "redirect" sends clients to a presigned GET; "stream" proxies the bytes through the API
+        self.serve_mode = os.environ.get('S3_SERVE_MODE', 'redirect')
+        self.s3 = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=os.environ.get('S3_REGION', 'us-east-1'),
+            aws_access_key_id=os.environ.get('S3_ACCESS_KEY_ID'),
+            aws_secret_access_key=os.environ.get('S3_SECRET_ACCESS_KEY'),
+            # MinIO and most self-hosted stores only do path-style addressing
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path" if endpoint_url else "auto"}),
+        )
+        # Files uploaded before switching to S3 stay where they were and are served from there
+        self.fallback = fallback
+
+    def key(self, filename: str, quarantined: bool = False) -> str:
+        return f"{self.prefix}{QUARANTINE_DIR}/{filename}" if quarantined else self.prefix + filename
+
+    async def save(self, filename: str, file: UploadFile):
+        # upload_fileobj switches to multipart on its own for large files
+        await asyncio.to_thread(
+            self.s3.upload_fileobj, file.file, self.bucket, self.key(filename),
+            ExtraArgs={"ContentType": file.content_type or "application/octet-stream"}
+        )
+
+    async def serve(self, filename: str) -> Response:
+        from botocore.exceptions import ClientError
+        # A local stat is cheaper than asking S3 whether the object exists
+        if self.fallback and self.fallback.has(filename):
+            return await self.fallback.serve(filename)
+        if self.serve_mode == "redirect":
+            url = await asyncio.to_thread(
+                self.s3.generate_presigned_url, "get_object",
+                Params={"Bucket": self.bucket, "Key": self.key(filename)},
+                ExpiresIn=PRESIGN_EXPIRES_SECONDS
+            )
+            return RedirectResponse(url, status_code=307)
+        try:
+            obj = await asyncio.to_thread(self.s3.get_object, Bucket=self.bucket, Key=self.key(filename))
+        except ClientError:
+            raise HTTPException(status_code=404, detail="File not found")
+        body = obj["Body"]
+
+        async def stream():
+            try:
+                while chunk := await asyncio.to_thread(body.read, UPLOAD_CHUNK_SIZE):
+                    yield chunk
+            finally:
+                body.close()
+
+        headers = {"Content-Length": str(obj["ContentLength"])}
+        return StreamingResponse(stream(), media_type=obj.get("ContentType"), headers=headers)
+
+    async def delete(self, filename: str, quarantined: bool = False):
+        await asyncio.to_thread(self.s3.delete_object, Bucket=self.bucket, Key=self.key(filename, quarantined))
+
+    async def list_files(self, quarantined: bool = False) -> List[dict]:
+        prefix = self.key("", quarantined)
+
+        def scan():
+            files = []
+            for page in self.s3.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=prefix):
+                for obj in page.get("Contents", []):
+                    name = obj["Key"][len(prefix):]
+                    # Skip the quarantine "directory" when listing live files
+                    if name and "/" not in name:
+                        files.append({"filename": name, "size": obj["Size"], "modified": obj["LastModified"].timestamp()})
+            return files
+
+        return await asyncio.to_thread(scan)
+
+    async def move(self, source: str, target: str):
+        await asyncio.to_thread(
+            self.s3.copy_object, Bucket=self.bucket, Key=target, CopySource={"Bucket": self.bucket, "Key": source}
+        )
+        await asyncio.to_thread(self.s3.delete_object, Bucket=self.bucket, Key=source)
+
+    async def quarantine(self, filename: str):
+        await self.move(self.key(filename), self.key(filename, quarantined=True))
+
+    async def restore(self, filename: str):
+        await self.move(self.key(filename, quarantined=True), self.key(filename))
+
+    async def presign_put(self, filename: str, content_type: str) -> str:
+        return await asyncio.to_thread(
+            self.s3.generate_presigned_url, "put_object",
+            Params={"Bucket": self.bucket, "Key": self.key(filename), "ContentType": content_type},
+            ExpiresIn=PRESIGN_EXPIRES_SECONDS
+        )
+
+    async def create_multipart(self, filename: str, content_type: str, parts: int) -> dict:
+        upload = await asyncio.to_thread(
+            self.s3.create_multipart_upload, Bucket=self.bucket, Key=self.key(filename), ContentType=content_type
+        )
+        urls = []
+        for part_number in range(1, parts + 1):
+            url = await asyncio.to_thread(
+                self.s3.generate_presigned_url, "upload_part",
+                Params={"Bucket": self.bucket, "Key": self.key(filename), "UploadId": upload["UploadId"], "PartNumber": part_number},
+                ExpiresIn=PRESIGN_EXPIRES_SECONDS
+            )
+            urls.append({"partNumber": part_number, "url": url})
+        return {"uploadId": upload["UploadId"], "parts": urls}
+
+    async def complete_multipart(self, filename: str, upload_id: str, parts: List[dict]):
+        await asyncio.to_thread(
+            self.s3.complete_multipart_upload, Bucket=self.bucket, Key=self.key(filename), UploadId=upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": p["partNumber"], "ETag": p["etag"]} for p in parts]}
+        )
+
+    async def abort_multipart(self, filename: str, upload_id: str):
+        await asyncio.to_thread(
+            self.s3.abort_multipart_upload, Bucket=self.bucket, Key=self.key(filename), UploadId=upload_id
+        )
+
+def create_upload_storage() -> UploadStorage:
+    if UPLOAD_STORAGE == "s3":
+        return S3UploadStorage(fallback=LocalUploadStorage(UPLOAD_DIR) if UPLOAD_DIR.is_dir() else None)
+    return LocalUploadStorage(UPLOAD_DIR)
+
+# Created in the lifespan so the S3 backend's boto3 import stays off the import path
+upload_storage = None
+
+# Anything else the client sent after the last dot is dropped, so stored names stay URL-safe
+UPLOAD_EXTENSION_PATTERN = re.compile(r"[A-Za-z0-9]{1,10}")
+
+def new_upload_filename(original: str) -> str:
+    file_id = str(uuid.uuid4())
+    file_ext = original.rsplit(".", 1)[-1] if "." in original else ""
+    return f"{file_id}.{file_ext}" if UPLOAD_EXTENSION_PATTERN.fullmatch(file_ext) else file_id
+
+class PresignRequest(BaseModel):
+    filename: str
+    contentType: Optional[str] = "application/octet-stream"
+
+class MultipartCreate(PresignRequest):
+    parts: int = Field(ge=1, le=10000)
+
+class MultipartComplete(BaseModel):
+    filename: str
+    uploadId: str
+    parts: List[dict]  # [{"partNumber": 1, "etag": "..."}]
+
+class MultipartAbort(BaseModel):
+    filename: str
+    uploadId: str
+
 @api_router.post("/upload")
 async def upload_file(file: UploadFile = File(...), current_user: dict = Depends(get_current_user)):
-    file_id = str(uuid.uuid4())
-    file_ext = file.filename.split(".")[-1] if "." in file.filename else ""
-    filename = f"{file_id}.{file_ext}" if file_ext else file_id
-    
-    file_path = UPLOAD_DIR / filename
-    
-    async with aiofiles.open(file_path, 'wb') as f:
-        content = await file.read()
-        await f.write(content)
-    
+    filename = new_upload_filename(file.filename)
+    await upload_storage.save(filename, file)
     return {"url": f"/api/uploads/{filename}", "filename": filename}
 
+@api_router.post("/upload/presign")
+async def presign_upload(data: PresignRequest, current_user: dict = Depends(get_current_user)):
+    """Presigned PUT so the client uploads straight to storage"""
+    filename = new_upload_filename(data.filename)
+    put_url = await upload_storage.presign_put(filename, data.contentType)
+    return {
+        "uploadUrl": put_url,
+        "method": "PUT",
+        "headers": {"Content-Type": data.contentType},
+        "url": f"/api/uploads/{filename}",
+        "filename": filename
+    }
+
+@api_router.post("/upload/multipart")
+async def create_multipart_upload(data: MultipartCreate, current_user: dict = Depends(get_current_user)):
+    """Start a multipart upload; the client PUTs each part to its presigned URL"""
+    filename = new_upload_filename(data.filename)
+    upload = await upload_storage.create_multipart(filename, data.contentType, data.parts)
+    return {"filename": filename, "url": f"/api/uploads/{filename}", **upload}
+
+@api_router.post("/upload/multipart/complete")
+async def complete_multipart_upload(data: MultipartComplete, current_user: dict = Depends(get_current_user)):
+    await upload_storage.complete_multipart(data.filename, data.uploadId, data.parts)
+    return {"url": f"/api/uploads/{data.filename}", "filename": data.filename}
+
+@api_router.post("/upload/multipart/abort")
+async def abort_multipart_upload(data: MultipartAbort, current_user: dict = Depends(get_current_user)):
+    await upload_storage.abort_multipart(data.filename, data.uploadId)
+    return {"success": True}
+
 @api_router.get("/uploads/{filename}")
 async def get_upload(filename: str):
-    file_path = UPLOAD_DIR / filename
-    if not file_path.exists():
+    # Uploads never start with a dot; .quarantine and temp files are not public
+    if filename.startswith("."):
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(file_path)
+    return await upload_storage.serve(filename)
+
+# ==================== UPLOAD GARBAGE COLLECTION ====================
+
+# "report" only measures, "quarantine" moves orphans aside, "delete" removes them
+UPLOAD_GC_MODE = os.environ.get('UPLOAD_GC_MODE', 'quarantine')
+UPLOAD_GC_MODES = ("report", "quarantine", "delete")
+# 0 disables the background run; /admin/uploads/gc still works
+UPLOAD_GC_INTERVAL_HOURS = float(os.environ.get('UPLOAD_GC_INTERVAL_HOURS', '24'))
+# Files younger than this are never collected: the upload may not be saved into content yet
+UPLOAD_GC_GRACE_HOURS = float(os.environ.get('UPLOAD_GC_GRACE_HOURS', '24'))
+UPLOAD_GC_QUARANTINE_DAYS = float(os.environ.get('UPLOAD_GC_QUARANTINE_DAYS', '30'))
+
+# Up to the first character that ends a URL in text, HTML or markdown; names are URL-decoded after
+UPLOAD_URL_PATTERN = re.compile(r"/uploads/([^\s\"'<>()?#/\\]+)")
+# Every stored name starts with the uuid new_upload_filename() gave it
+UPLOAD_ID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+# heroImage, coverImage, bannerImage, Media.url and attachments, plus upload links embedded in
+# article/page content and sections and the logo setting, so every string field is scanned
+UPLOAD_REFERENCE_COLLECTIONS = ["pages", "articles", "events", "media", "documents", "members", "settings"]
+
+def upload_id(filename: str) -> str:
+    """What references are matched on: the uuid, so an extension that was mangled in a URL (or
+    stored before extensions were restricted, e.g. "<uuid>.my pic") still counts; else the name"""
+    match = UPLOAD_ID_PATTERN.match(filename)
+    return match[0] if match else filename
+
+def collect_upload_names(value, names: set):
+    if isinstance(value, str):
+        if "/uploads/" in value:
+            names.update(upload_id(unquote(name)) for name in UPLOAD_URL_PATTERN.findall(value))
+    elif isinstance(value, dict):
+        for item in value.values():
+            collect_upload_names(item, names)
+    elif isinstance(value, list):
+        for item in value:
+            collect_upload_names(item, names)
+
+async def referenced_uploads() -> set:
+    """upload_id() of every file any stored document points at, streamed one document at a time"""
+    names = set()
+    for collection in UPLOAD_REFERENCE_COLLECTIONS:
+        async for doc in db[collection].find({}, {"_id": 0}):
+            collect_upload_names(doc, names)
+    return names
+
+async def collect_uploads(mode: str = UPLOAD_GC_MODE) -> dict:
+    """Compare stored files against references; orphans past the grace period are quarantined or deleted"""
+    started = time.perf_counter()
+    now = time.time()
+    referenced = await referenced_uploads()
+    grace_cutoff = now - UPLOAD_GC_GRACE_HOURS * 3600
+    purge_cutoff = now - UPLOAD_GC_QUARANTINE_DAYS * 86400
+    stats = {key: 0 for key in (
+        "files", "bytes", "referencedFiles", "referencedBytes", "recentFiles", "recentBytes",
+        "orphanedFiles", "orphanedBytes", "removedFiles", "removedBytes",
+        "quarantinedFiles", "quarantinedBytes", "restoredFiles", "purgedFiles", "purgedBytes", "errors"
+    )}
+
+    async def apply(action, filename: str, *args) -> bool:
+        try:
+            await action(filename, *args)
+            return True
+        except Exception as e:
+            logger.warning("Upload collector could not %s %s: %s", action.__name__, filename, e)
+            stats["errors"] += 1
+            return False
+
+    for file in await upload_storage.list_files():
+        name, size = file["filename"], file["size"]
+        stats["files"] += 1
+        stats["bytes"] += size
+        if upload_id(name) in referenced:
+            stats["referencedFiles"] += 1
+            stats["referencedBytes"] += size
+        elif file["modified"] > grace_cutoff:
+            stats["recentFiles"] += 1
+            stats["recentBytes"] += size
+        else:
+            stats["orphanedFiles"] += 1
+            stats["orphanedBytes"] += size
+            if mode != "report" and await apply(upload_storage.quarantine if mode == "quarantine" else upload_storage.delete, name):
+                stats["removedFiles"] += 1
+                stats["removedBytes"] += size
+
+    for file in await upload_storage.list_files(quarantined=True):
+        name, size = file["filename"], file["size"]
+        if upload_id(name) in referenced:
+            # Content pointing at it again (e.g. an article restored from a backup)
+            if mode != "report" and await apply(upload_storage.restore, name):
+                stats["restoredFiles"] += 1
+                continue
+        elif mode != "report" and file["modified"] < purge_cutoff:
+            if await apply(upload_storage.delete, name, True):
+                stats["purgedFiles"] += 1
+                stats["purgedBytes"] += size
+                continue
+        stats["quarantinedFiles"] += 1
+        stats["quarantinedBytes"] += size
+
+    # Unreferenced bytes past the grace period still taking space after this run; orphans
+    # quarantined above were listed again in the quarantine pass
+    stats["reclaimableBytes"] = stats["orphanedBytes"] - stats["removedBytes"] + stats["quarantinedBytes"]
+    return {
+        "mode": mode,
+        "graceHours": UPLOAD_GC_GRACE_HOURS,
+        "ranAt": datetime.now(timezone.utc),
+        "durationMs": round((time.perf_counter() - started) * 1000, 2),
+        **stats
+    }
+
+class UploadCollector:
+    """Runs collect_uploads() every interval on whichever worker takes the lease"""
+
+    LEASE_ID = "upload_gc_lease"
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.task = None
+
+    def start(self):
+        if self.interval > 0:
+            self.task = asyncio.ensure_future(self.run())
+
+    async def acquire_lease(self) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            # _id is always unique, so with N workers only one upsert (or match) wins per interval
+            await db.settings.update_one(
+                {"_id": self.LEASE_ID, "until": {"$lt": now}},
+                {"$set": {"until": now + timedelta(seconds=self.interval * 0.9)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if await self.acquire_lease():
+                    await save_upload_report(await collect_uploads())
+            except Exception as e:
+                logger.warning("Upload collection failed: %s", e)
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+
+async def save_upload_report(report: dict):
+    await db.settings.update_one(
+        {"key": "upload_gc"},
+        {"$set": {"key": "upload_gc", "value": report, "updatedAt": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    logger.info(
+        "Upload collector (%s): %d orphaned files, %d removed, %d bytes reclaimable",
+        report["mode"], report["orphanedFiles"], report["removedFiles"], report["reclaimableBytes"]
+    )
+
+upload_collector = UploadCollector(UPLOAD_GC_INTERVAL_HOURS * 3600)
 
 # ==================== SETTINGS (LOGO) ====================
 
@@ -674,9 +2344,9 @@ class LogoSettings(BaseModel):
     logoUrl: str
 
 @api_router.get("/settings/logo")
-async def get_logo():
+async def get_logo(read_db=Depends(get_read_db)):
     """Get current logo URL"""
-    settings = await db.settings.find_one({"key": "logo"}, {"_id": 0})
+    settings = await read_db.settings.find_one({"key": "logo"}, {"_id": 0})
     if settings:
         return {"logoUrl": settings.get("value", "")}
     return {"logoUrl": ""}
@@ -686,9 +2356,10 @@ async def save_logo(data: LogoSettings, current_user: dict = Depends(get_current
     """Save logo URL"""
     await db.settings.update_one(
         {"key": "logo"},
-        {"$set": {"key": "logo", "value": data.logoUrl, "updatedAt": datetime.now(timezone.utc).isoformat()}},
+        {"$set": {"key": "logo", "value": data.logoUrl, "updatedAt": datetime.now(timezone.utc)}},
         upsert=True
     )
+    await refresh_snapshots("settings")
     return {"message": "Logo saved", "logoUrl": data.logoUrl}
 
 # ==================== SEED DATA ====================
@@ -729,6 +2400,7 @@ async def seed_data():
     # Clear and seed members
     await db.members.delete_many({})
     await db.members.insert_many(sample_members)
+    await refresh_galaxy_layout()
     
     # Seed page content
     home_page = {
@@ -750,7 +2422,7 @@ async def seed_data():
                 ]
             }
         ],
-        "updatedAt": datetime.now(timezone.utc).isoformat()
+        "updatedAt": datetime.now(timezone.utc)
     }
     
     about_page = {
@@ -778,7 +2450,7 @@ async def seed_data():
                 ]
             }
         ],
-        "updatedAt": datetime.now(timezone.utc).isoformat()
+        "updatedAt": datetime.now(timezone.utc)
     }
     
     philosophy_page = {
@@ -805,9 +2477,11 @@ async def seed_data():
                 ]
             }
         ],
-        "updatedAt": datetime.now(timezone.utc).isoformat()
+        "updatedAt": datetime.now(timezone.utc)
     }
     
+    for page in (home_page, about_page, philosophy_page):
+        page["version"] = 1
     await db.pages.delete_many({})
     await db.pages.insert_many([home_page, about_page, philosophy_page])
     
@@ -821,8 +2495,8 @@ async def seed_data():
             "content": "<p>Dalam kajian bulanan ini, kami membahas tentang pentingnya meningkatkan kualitas ibadah. Ibadah bukan hanya sekedar ritual, tetapi juga harus membawa perubahan positif dalam kehidupan sehari-hari.</p><p>Beberapa tips yang disampaikan antara lain: menjaga kekhusyukan dalam shalat, memperbanyak dzikir, dan meningkatkan amal sosial.</p>",
             "coverImage": "https://images.unsplash.com/photo-1585036156171-384164a8c675?w=800",
             "tags": ["kajian", "ibadah", "spiritual"],
-            "createdAt": datetime.now(timezone.utc).isoformat(),
-            "updatedAt": datetime.now(timezone.utc).isoformat()
+            "createdAt": datetime.now(timezone.utc),
+            "updatedAt": datetime.now(timezone.utc)
         },
         {
             "id": str(uuid.uuid4()),
@@ -832,13 +2506,14 @@ async def seed_data():
             "content": "<p>Alhamdulillah, tim Geunaseh Jeumala telah melaksanakan kegiatan bakti sosial di desa terpencil. Kegiatan ini meliputi pembagian sembako, pengobatan gratis, dan kegiatan edukasi untuk anak-anak.</p>",
             "coverImage": "https://images.unsplash.com/photo-1559027615-cd4628902d4a?w=800",
             "tags": ["sosial", "bakti", "komunitas"],
-            "createdAt": datetime.now(timezone.utc).isoformat(),
-            "updatedAt": datetime.now(timezone.utc).isoformat()
+            "createdAt": datetime.now(timezone.utc),
+            "updatedAt": datetime.now(timezone.utc)
         }
     ]
     
     await db.articles.delete_many({})
     await db.articles.insert_many(sample_articles)
+    await refresh_tag_counts()
     
     # Seed events
     sample_events = [
@@ -848,12 +2523,13 @@ async def seed_data():
             "slug": "seminar-kepemimpinan-islam",
             "date": "2025-07-15",
             "time": "09:00 - 15:00 WIB",
+            "startsAt": parse_event_date("2025-07-15", "09:00 - 15:00 WIB"),
             "location": "Aula Kampus Utama",
             "description": "Seminar tentang kepemimpinan dalam perspektif Islam dengan pembicara para ulama dan praktisi.",
             "bannerImage": "https://images.unsplash.com/photo-1540575467063-178a50c2df87?w=800",
             "capacity": 200,
-            "createdAt": datetime.now(timezone.utc).isoformat(),
-            "updatedAt": datetime.now(timezone.utc).isoformat()
+            "createdAt": datetime.now(timezone.utc),
+            "updatedAt": datetime.now(timezone.utc)
         },
         {
             "id": str(uuid.uuid4()),
@@ -861,12 +2537,13 @@ async def seed_data():
             "slug": "workshop-public-speaking",
             "date": "2025-07-22",
             "time": "13:00 - 17:00 WIB",
+            "startsAt": parse_event_date("2025-07-22", "13:00 - 17:00 WIB"),
             "location": "Ruang Serbaguna Lt. 3",
             "description": "Pelatihan public speaking untuk meningkatkan kemampuan komunikasi dan presentasi.",
             "bannerImage": "https://images.unsplash.com/photo-1475721027785-f74eccf877e2?w=800",
             "capacity": 50,
-            "createdAt": datetime.now(timezone.utc).isoformat(),
-            "updatedAt": datetime.now(timezone.utc).isoformat()
+            "createdAt": datetime.now(timezone.utc),
+            "updatedAt": datetime.now(timezone.utc)
         }
     ]
     
@@ -883,8 +2560,8 @@ async def seed_data():
             "content": "<p>Selamat datang di Geunaseh Jeumala! Dokumen ini berisi panduan lengkap untuk anggota baru.</p>",
             "attachments": [],
             "docType": "documentation",
-            "createdAt": datetime.now(timezone.utc).isoformat(),
-            "updatedAt": datetime.now(timezone.utc).isoformat()
+            "createdAt": datetime.now(timezone.utc),
+            "updatedAt": datetime.now(timezone.utc)
         },
         {
             "id": str(uuid.uuid4()),
@@ -894,8 +2571,8 @@ async def seed_data():
             "content": "<p>Laporan ini berisi rangkuman seluruh kegiatan yang telah dilaksanakan.</p>",
             "attachments": [],
             "docType": "report",
-            "createdAt": datetime.now(timezone.utc).isoformat(),
-            "updatedAt": datetime.now(timezone.utc).isoformat()
+            "createdAt": datetime.now(timezone.utc),
+            "updatedAt": datetime.now(timezone.utc)
         },
         {
             "id": str(uuid.uuid4()),
@@ -905,8 +2582,8 @@ async def seed_data():
             "content": "<p>Berbagai kegiatan yang dilaksanakan selama bulan suci Ramadhan.</p>",
             "attachments": [],
             "docType": "activity",
-            "createdAt": datetime.now(timezone.utc).isoformat(),
-            "updatedAt": datetime.now(timezone.utc).isoformat()
+            "createdAt": datetime.now(timezone.utc),
+            "updatedAt": datetime.now(timezone.utc)
         }
     ]
     
@@ -921,7 +2598,7 @@ async def seed_data():
             "type": "image",
             "url": "https://images.unsplash.com/photo-1559027615-cd4628902d4a?w=800",
             "description": "Dokumentasi kegiatan bakti sosial",
-            "createdAt": datetime.now(timezone.utc).isoformat()
+            "createdAt": datetime.now(timezone.utc)
         },
         {
             "id": str(uuid.uuid4()),
@@ -929,15 +2606,166 @@ async def seed_data():
             "type": "image",
             "url": "https://images.unsplash.com/photo-1585036156171-384164a8c675?w=800",
             "description": "Suasana kajian rutin mingguan",
-            "createdAt": datetime.now(timezone.utc).isoformat()
+            "createdAt": datetime.now(timezone.utc)
         }
     ]
     
     await db.media.delete_many({})
     await db.media.insert_many(sample_media)
     
+    if SNAPSHOT_DIR:
+        await export_all_snapshots()
+    
     return {"success": True, "message": "Data berhasil di-seed"}
 
+# ==================== ADMIN METRICS ====================
+
+@api_router.get("/admin/limits")
+async def get_limit_stats(current_user: dict = Depends(get_current_user)):
+    """Rejection counters for tuning rate-limit budgets and the concurrency cap, plus collapsed reads"""
+    return {
+        "budgets": {
+            route: {"ratePerSecond": rate, "burst": burst}
+            for route, (rate, burst) in RATE_LIMITS.items()
+        },
+        "rateLimited": dict(limiter_stats["rate_limited"]),
+        "overloaded": limiter_stats["overloaded"],
+        "inFlight": limiter_stats["in_flight"],
+        "maxConcurrentRequests": MAX_CONCURRENT_REQUESTS,
+        "trackedBuckets": len(rate_limiter.buckets),
+        "readCoalescing": single_flight.snapshot()
+    }
+
+@api_router.post("/admin/snapshots")
+async def export_snapshots(current_user: dict = Depends(get_current_user)):
+    """Full re-export of the static JSON snapshots"""
+    if not SNAPSHOT_DIR:
+        raise HTTPException(status_code=400, detail="SNAPSHOT_DIR is not configured")
+    files = await export_all_snapshots()
+    return {"success": True, "files": files, "directory": SNAPSHOT_DIR}
+
+@api_router.get("/admin/uploads")
+async def get_upload_usage(current_user: dict = Depends(get_current_user)):
+    """Disk usage of uploads and what a collection would reclaim now, without touching any file"""
+    stored = await db.settings.find_one({"key": "upload_gc"}, {"_id": 0, "value": 1})
+    return {"current": await collect_uploads("report"), "lastRun": stored["value"] if stored else None}
+
+@api_router.post("/admin/uploads/gc")
+async def run_upload_gc(mode: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    """Collect orphaned uploads now; mode defaults to UPLOAD_GC_MODE"""
+    mode = mode or UPLOAD_GC_MODE
+    if mode not in UPLOAD_GC_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode, expected one of: {', '.join(UPLOAD_GC_MODES)}")
+    report = await collect_uploads(mode)
+    await save_upload_report(report)
+    return report
+
+# ==================== PROFILER ====================
+
+MAX_PROFILE_SECONDS = 60
+KEPT_REQUEST_PROFILES = 20
+
+class StackSampler:
+    """Samples one thread's Python stack from a helper thread; nothing runs while it is stopped"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(parts))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format, readable by flamegraph.pl and speedscope"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+profiler_lock = asyncio.Lock()
+# Per-request profiles by trace ID, oldest evicted first
+request_profiles = OrderedDict()
+
+async def profile_requested(request: Request) -> bool:
+    """X-Profile only takes effect for a bearer token get_current_user accepts"""
+    if "x-profile" not in request.headers:
+        return False
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer":
+        return False
+    try:
+        # Same check as the admin routes, so tokens of deleted users can't profile
+        await get_current_user(HTTPAuthorizationCredentials(scheme=scheme, credentials=token))
+    except HTTPException:
+        return False
+    return True
+
+def store_request_profile(trace_id: str, sampler: StackSampler):
+    request_profiles[trace_id] = sampler.collapsed()
+    while len(request_profiles) > KEPT_REQUEST_PROFILES:
+        request_profiles.popitem(last=False)
+
+@api_router.get("/admin/profile", response_class=PlainTextResponse)
+async def profile_worker(seconds: float = 10, interval_ms: float = 5, current_user: dict = Depends(get_current_user)):
+    """Sample this worker's event loop for N seconds and return collapsed stacks"""
+    if profiler_lock.locked():
+        raise HTTPException(status_code=409, detail="Profiler already running on this worker")
+    async with profiler_lock:
+        sampler = StackSampler(threading.get_ident(), min(max(interval_ms, 1), 1000) / 1000).start()
+        try:
+            await asyncio.sleep(min(max(seconds, 0.1), MAX_PROFILE_SECONDS))
+        finally:
+            sampler.stop()
+    return PlainTextResponse(sampler.collapsed(), headers={"X-Profile-Samples": str(sampler.samples), "X-Profile-Pid": str(os.getpid())})
+
+@api_router.get("/admin/profile/{trace_id}", response_class=PlainTextResponse)
+async def get_request_profile(trace_id: str, current_user: dict = Depends(get_current_user)):
+    """Collapsed stacks sampled while a request sent with X-Profile was in flight"""
+    if trace_id not in request_profiles:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return request_profiles[trace_id]
+
+# ==================== HEALTH ====================
+
+@api_router.get("/health")
+async def health():
+    """DB ping latency and connection pool usage"""
+    started = time.perf_counter()
+    try:
+        await db.command("ping")
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"status": "error", "detail": str(e)})
+    return {
+        "status": "ok",
+        "db": {
+            "engine": STORAGE_ENGINE,
+            "pingMs": round((time.perf_counter() - started) * 1000, 2),
+            "maxPoolSize": MONGO_POOL_OPTIONS["maxPoolSize"],
+            "publicReadPreference": PUBLIC_READ_PREFERENCE,
+            "pool": pool_stats.snapshot() if pool_stats else {}
+        }
+    }
+
 # ==================== ROOT ====================
 
 @api_router.get("/")
@@ -947,6 +2775,58 @@ async def root():
 # Include the router
 app.include_router(api_router)
 
+@app.middleware("http")
+async def concurrency_cap(request: Request, call_next):
+    # Fail fast with 503 rather than letting requests pile up behind a saturated worker
+    if limiter_stats["in_flight"] >= MAX_CONCURRENT_REQUESTS:
+        limiter_stats["overloaded"] += 1
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Server overloaded"},
+            headers={"Retry-After": "1"}
+        )
+    limiter_stats["in_flight"] += 1
+    try:
+        return await call_next(request)
+    finally:
+        limiter_stats["in_flight"] -= 1
+
+@app.middleware("http")
+async def request_tracing(request: Request, call_next):
+    trace = RequestTrace(
+        request.headers.get("x-request-id") or uuid.uuid4().hex,
+        request.method,
+        request.url.path
+    )
+    current_trace.set(trace)
+    # Samples cover everything the event loop ran while this request was in flight
+    sampler = StackSampler(threading.get_ident(), 0.001).start() if await profile_requested(request) else None
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = trace.trace_id
+        if sampler:
+            response.headers["X-Profile-Id"] = trace.trace_id
+        return response
+    finally:
+        if sampler:
+            store_request_profile(trace.trace_id, sampler.stop())
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if elapsed_ms >= SLOW_REQUEST_MS:
+            slow_logger.warning(json.dumps({
+                "type": "slow_request",
+                "traceId": trace.trace_id,
+                "method": trace.method,
+                "path": trace.path,
+                "route": getattr(request.scope.get("route"), "path", None),
+                "status": status,
+                "ms": round(elapsed_ms, 2),
+                "dbMs": round(sum(q["ms"] for q in trace.queries), 2),
+                "queries": trace.queries
+            }, default=str))
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -955,13 +2835,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging: handlers write from a background thread so the event loop never blocks on I/O
+log_queue = queue.SimpleQueue()
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_listener = QueueListener(log_queue, log_handler, respect_handler_level=True)
+queue_handler = QueueHandler(log_queue)
+# prepare() formats before enqueueing; keep that to the bare message so only log_handler adds the prefix
+queue_handler.setFormatter(logging.Formatter('%(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+log_listener.start()
+atexit.register(log_listener.stop)
 logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+slow_logger = logging.getLogger("geunaseh.slow")
@@ -0,0 +1,58 @@
+"""Launcher for the Geunaseh Jeumala demo backend
+
+Runs uvicorn on uvloop + httptools. The store lives inside the process, so
+this always runs a single worker: with more, a write would land in one worker
+and reads from the others would miss it. The MongoDB API in app/backend/run.py
+is the one that pre-forks. On SIGTERM the worker stops accepting and drains
+in-flight requests for up to --graceful-timeout seconds.
+
+    python run.py --port 8001
+"""
+import argparse
+import os
+
+import uvicorn
+
+
+def worker_count(requested: int) -> int:
+    """Workers actually started for a requested count"""
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the demo API")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8001")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", "1")))
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.environ.get("GRACEFUL_TIMEOUT", "30")))
+    parser.add_argument("--keep-alive", type=int, default=int(os.environ.get("KEEP_ALIVE", "5")))
+    parser.add_argument("--backlog", type=int, default=2048)
+    # Proxies whose X-Forwarded-For is believed; the client IP is the last hop not in this list
+    parser.add_argument("--forwarded-allow-ips", default=os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1"))
+    parser.add_argument("--log-level", default=os.environ.get("LOG_LEVEL", "info"))
+    args = parser.parse_args()
+    if worker_count(args.workers) != args.workers:
+        print(f"server.py keeps its data in-process, running 1 worker instead of {args.workers}")
+        args.workers = worker_count(args.workers)
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    uvicorn.run(
+        "server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop",
+        http="httptools",
+        lifespan="on",
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+        forwarded_allow_ips=args.forwarded_allow_ips,
+        access_log=False,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
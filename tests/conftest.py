@@ -0,0 +1,41 @@
+"""Runs the API in app/backend on the in-process storage engine, no MongoDB needed"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "app" / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Before server is imported: module-level config reads these once
+os.environ["STORAGE_ENGINE"] = "memory"
+os.environ["MEMORY_ENGINE_FILE"] = ""
+os.environ["SNAPSHOT_DIR"] = ""
+os.environ["UPLOAD_GC_INTERVAL_HOURS"] = "0"
+
+import server  # noqa: E402
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """TestClient with a fresh in-memory database (each lifespan creates a new one)"""
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(server, "UPLOAD_DIR", tmp_path / "uploads")
+    server.rate_limiter.buckets.clear()
+    server.idempotency_cache.clear()
+    # Worker-level caches would otherwise carry results over from the previous test's database
+    server.popular_cache.clear()
+    server.tag_cache.update(expires=0.0, tags=None)
+    with TestClient(server.app) as client:
+        yield client
+
+
+@pytest.fixture
+def admin(api):
+    """Authorization headers for a freshly signed-up admin"""
+    credentials = {"username": "admin", "password": "secret", "secretCode": server.ADMIN_SECRET_CODE}
+    api.post("/api/auth/signup", json=credentials)
+    token = api.post("/api/auth/login", json=credentials).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,54 @@
+import json
+import random
+
+import server
+from memory_engine import MemoryClient
+
+
+def members(count):
+    return [
+        {"id": f"m{i}", "name": f"Member {i}", "position": "", "division": ("Media", "Dakwah", "")[i % 3]}
+        for i in range(count)
+    ]
+
+
+def test_layout_is_deterministic():
+    shuffled = members(30)
+    random.Random(1).shuffle(shuffled)
+    layout = server.compute_galaxy_layout(members(30))
+    assert server.compute_galaxy_layout(shuffled) == layout
+    assert layout["count"] == 30
+    assert [d["name"] for d in layout["divisions"]] == ["", "Dakwah", "Media"]
+    stars = [star for division in layout["divisions"] for star in division["stars"]]
+    assert all(0 <= star[3] <= 1 and 0 <= star[4] <= 1 and 0 <= star[5] < server.GALAXY_LAYERS for star in stars)
+
+
+def test_galaxy_etag_and_304(api, admin):
+    first = api.get("/api/members/galaxy")
+    etag = first.headers["ETag"]
+    assert first.json()["count"] == 0
+    assert api.get("/api/members/galaxy", headers={"If-None-Match": etag}).status_code == 304
+
+    api.post("/api/members", headers=admin, json={"name": "Ali", "division": "Media"})
+    changed = api.get("/api/members/galaxy", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["divisions"][0]["stars"][0][1] == "Ali"
+
+
+def test_snapshot_gets_new_layout_with_lagging_secondary(api, admin, tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "SNAPSHOT_DIR", str(tmp_path))
+    api.get("/api/members/galaxy")
+    # The secondary still has the layout from before the edit below
+    async def stale_copy():
+        lagging = MemoryClient()["lagging"]
+        await lagging.settings.insert_many(await server.db.settings.find({}).to_list(None))
+        return lagging
+
+    lagging = api.portal.call(stale_copy)
+    monkeypatch.setattr(server, "public_db", lagging)
+
+    api.post("/api/members", headers=admin, json={"name": "Ali", "division": "Media"})
+    snapshot = json.loads((tmp_path / "members" / "galaxy.json").read_text())
+    assert snapshot["count"] == 1
+    assert api.get("/api/members/galaxy").json()["count"] == 1
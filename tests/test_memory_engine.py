@@ -0,0 +1,179 @@
+import asyncio
+
+import pytest
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from memory_engine import MemoryClient
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def db():
+    return MemoryClient()["test"]
+
+
+def test_unique_index_rejects_duplicates(db):
+    async def scenario():
+        await db.registrations.create_index([("eventId", 1), ("email", 1)], unique=True, name="event_email_unique")
+        await db.registrations.insert_one({"eventId": "e1", "email": "a@x.id"})
+        await db.registrations.insert_one({"eventId": "e2", "email": "a@x.id"})
+        with pytest.raises(DuplicateKeyError):
+            await db.registrations.insert_one({"eventId": "e1", "email": "a@x.id"})
+        # Updates into an existing key are rejected too, leaving the document unchanged
+        with pytest.raises(DuplicateKeyError):
+            await db.registrations.update_one({"eventId": "e2"}, {"$set": {"eventId": "e1"}})
+        assert await db.registrations.count_documents({"eventId": "e2"}) == 1
+
+    run(scenario())
+
+
+def test_unique_id_and_index_build_over_duplicates(db):
+    async def scenario():
+        await db.settings.insert_one({"_id": "lease"})
+        with pytest.raises(DuplicateKeyError):
+            await db.settings.insert_one({"_id": "lease"})
+        await db.pages.insert_many([{"pageId": "home"}, {"pageId": "home"}])
+        with pytest.raises(DuplicateKeyError):
+            await db.pages.create_index([("pageId", 1)], unique=True, name="page_id_unique")
+
+    run(scenario())
+
+
+def test_bulk_write_reports_duplicates_per_op(db):
+    async def scenario():
+        await db.regs.create_index([("id", 1)], unique=True, name="id")
+        await db.regs.insert_one({"email": "taken", "id": "taken"})
+        ops = [UpdateOne({"email": e}, {"$setOnInsert": {"id": e}}, upsert=True) for e in ("new", "taken", "clash")]
+        ops.append(UpdateOne({"email": "clash"}, {"$setOnInsert": {"id": "new"}}, upsert=True))
+        with pytest.raises(BulkWriteError) as error:
+            await db.regs.bulk_write(ops[:2] + ops[3:], ordered=False)
+        details = error.value.details
+        # The other operations still apply; only the conflicting one is reported
+        assert [e["index"] for e in details["writeErrors"]] == [2]
+        assert details["writeErrors"][0]["code"] == 11000
+        assert details["nUpserted"] == 1 and details["nMatched"] == 1
+        assert await db.regs.count_documents({}) == 2
+
+    run(scenario())
+
+
+def test_upsert_seeds_equality_fields(db):
+    async def scenario():
+        doc = await db.pages.find_one_and_update(
+            {"pageId": "home", "version": {"$in": [0, None]}},
+            {"$set": {"heroTitle": "Hi"}, "$setOnInsert": {"sections": []}, "$inc": {"version": 1}},
+            upsert=True,
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        # Equality fields are copied, operator conditions are not
+        assert doc == {"pageId": "home", "heroTitle": "Hi", "sections": [], "version": 1}
+        await db.pages.update_one({"pageId": "home"}, {"$set": {"heroTitle": "Again"}, "$setOnInsert": {"sections": ["x"]}}, upsert=True)
+        assert (await db.pages.find_one({"pageId": "home"}, {"_id": 0}))["sections"] == []
+
+    run(scenario())
+
+
+def test_array_filters_update_matching_elements(db):
+    async def scenario():
+        await db.pages.insert_one({"pageId": "home", "sections": [
+            {"id": "s1", "items": [{"id": "i1", "name": "a"}, {"id": "i2", "name": "b"}]},
+            {"id": "s2", "items": [{"id": "i1", "name": "c"}]},
+        ]})
+        result = await db.pages.update_one(
+            {"pageId": "home"},
+            {"$set": {"sections.$[s].items.$[i].name": "z", "sections.$[s].items.0.flag": True}},
+            array_filters=[{"s.id": "s1"}, {"i.id": "i1"}],
+        )
+        assert result.modified_count == 1
+        page = await db.pages.find_one({"pageId": "home"}, {"_id": 0})
+        assert page["sections"][0]["items"] == [{"id": "i1", "name": "z", "flag": True}, {"id": "i2", "name": "b"}]
+        assert page["sections"][1]["items"] == [{"id": "i1", "name": "c"}]
+
+    run(scenario())
+
+
+def test_pipeline_set_merges_or_appends_section(db):
+    def update(section_id, fields):
+        sections = {"$ifNull": ["$sections", []]}
+        literal = {key: {"$literal": value} for key, value in fields.items()}
+        return [{"$set": {
+            "sections": {"$cond": [
+                {"$in": [section_id, {"$ifNull": ["$sections.id", []]}]},
+                {"$map": {"input": sections, "as": "s", "in": {"$cond": [
+                    {"$eq": ["$$s.id", section_id]}, {"$mergeObjects": ["$$s", literal]}, "$$s"
+                ]}}},
+                {"$concatArrays": [sections, [{"$mergeObjects": [{"id": section_id}, literal]}]]},
+            ]},
+            "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+        }}]
+
+    async def scenario():
+        await db.pages.update_one({"pageId": "home"}, update("s1", {"title": "One", "items": [{"$x": 1}]}), upsert=True)
+        await db.pages.update_one({"pageId": "home"}, update("s2", {"title": "Two"}), upsert=True)
+        await db.pages.update_one({"pageId": "home"}, update("s1", {"title": "Uno"}), upsert=True)
+        page = await db.pages.find_one({"pageId": "home"}, {"_id": 0})
+        assert page["version"] == 3
+        # $literal keeps operator-looking user data as plain values
+        assert page["sections"] == [{"id": "s1", "title": "Uno", "items": [{"$x": 1}]}, {"id": "s2", "title": "Two"}]
+
+    run(scenario())
+
+
+def test_pipeline_date_from_string(db):
+    async def scenario():
+        await db.articles.insert_many([{"createdAt": "2024-01-02T03:04:05.123456+07:00"}, {"createdAt": "not a date"}])
+        result = await db.articles.update_many(
+            {"createdAt": {"$type": "string"}},
+            [{"$set": {"createdAt": {"$dateFromString": {"dateString": "$createdAt", "onError": "$createdAt"}}}}],
+        )
+        assert result.matched_count == 2 and result.modified_count == 1
+        values = [doc["createdAt"] for doc in await db.articles.find({}, {"_id": 0}).to_list(None)]
+        assert values[0].isoformat() == "2024-01-01T20:04:05.123000+00:00"
+        assert values[1] == "not a date"
+
+    run(scenario())
+
+
+def test_unwind_group_sort(db):
+    async def scenario():
+        await db.articles.insert_many([{"tags": ["a", "b"]}, {"tags": ["b"]}, {"tags": []}, {"title": "untagged"}])
+        pipeline = [
+            {"$unwind": "$tags"},
+            {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}},
+        ]
+        assert await db.articles.aggregate(pipeline).to_list(None) == [{"_id": "b", "count": 2}, {"_id": "a", "count": 1}]
+
+    run(scenario())
+
+
+def test_find_filters_sort_projection_and_count(db):
+    async def scenario():
+        await db.events.create_index([("tags", 1), ("n", -1)], name="tags_n")
+        await db.events.insert_many([{"n": i, "tags": ["odd" if i % 2 else "even"]} for i in range(10)])
+        found = await db.events.find({"tags": "odd", "n": {"$gte": 3}}, {"_id": 0, "n": 1}).sort("n", -1).skip(1).to_list(2)
+        assert found == [{"n": 7}, {"n": 5}]
+        assert await db.events.count_documents({"$or": [{"n": 1}, {"n": {"$gt": 7}}]}) == 3
+        assert await db.events.find_one({"n": 2}, {"_id": 0, "tags": 0}) == {"n": 2}
+        assert (await db.events.delete_many({"tags": "even"})).deleted_count == 5
+        assert await db.events.count_documents({"tags": "even"}) == 0
+
+    run(scenario())
+
+
+def test_persistence_round_trip(tmp_path):
+    path = str(tmp_path / "data.pkl")
+
+    async def scenario():
+        client = MemoryClient(path)
+        await client["test"].articles.insert_one({"slug": "a"})
+        client.close()
+        reloaded = MemoryClient(path)
+        return await reloaded["test"].articles.find_one({}, {"_id": 0})
+
+    assert run(scenario()) == {"slug": "a"}
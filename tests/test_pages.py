@@ -0,0 +1,50 @@
+def test_page_patch_version_conflict(api, admin):
+    first = api.patch("/api/pages/home", headers=admin, json={"version": 0, "data": {"heroTitle": "A"}})
+    assert first.json() == {"success": True, "version": 1}
+
+    stale = api.patch("/api/pages/home", headers=admin, json={"version": 0, "data": {"heroTitle": "B"}})
+    assert stale.status_code == 409
+    assert stale.json()["detail"]["version"] == 1
+
+    section = api.patch("/api/pages/home/sections/s1", headers=admin, json={"version": 1, "data": {"items": [{"id": "i1", "name": "x"}]}})
+    assert section.json()["version"] == 2
+    item = api.patch("/api/pages/home/sections/s1/items/i1", headers=admin, json={"version": 2, "value": {"name": "y"}})
+    assert item.json()["version"] == 3
+    assert api.patch("/api/pages/home/sections/s1/items/i1", headers=admin, json={"version": 2, "value": {"name": "z"}}).status_code == 409
+
+    page = api.get("/api/pages/home").json()
+    assert page["heroTitle"] == "A"
+    assert page["sections"] == [{"id": "s1", "items": [{"id": "i1", "name": "y"}]}]
+
+
+def test_page_patch_does_not_create_with_expected_version(api, admin):
+    response = api.patch("/api/pages/missing", headers=admin, json={"version": 5, "data": {"heroTitle": "A"}})
+    assert response.status_code == 404
+    assert api.get("/api/pages/missing").json()["version"] == 0
+
+
+def test_section_patch_creates_page_and_merges_fields(api, admin):
+    created = api.patch("/api/pages/about/sections/mission", headers=admin, json={"data": {"items": ["a", "b"]}})
+    assert created.json()["version"] == 1
+    api.patch("/api/pages/about/sections/mission", headers=admin, json={"data": {"title": "Misi"}})
+    api.patch("/api/pages/about/sections/vision", headers=admin, json={"data": {"title": "Visi"}})
+    # Bare string items are addressed by index
+    api.patch("/api/pages/about/sections/mission/items/1", headers=admin, json={"value": "c"})
+    page = api.get("/api/pages/about").json()
+    assert page["sections"] == [{"id": "mission", "items": ["a", "c"], "title": "Misi"}, {"id": "vision", "title": "Visi"}]
+    assert page["version"] == 4
+
+
+def test_patch_rejects_operator_and_dotted_keys(api, admin):
+    for data in ({"$set": 1}, {"a.b": 1}, {"id": "x"}):
+        assert api.patch("/api/pages/home/sections/s1", headers=admin, json={"data": data}).status_code == 400
+    assert api.patch("/api/pages/home", headers=admin, json={"data": {"sections": []}}).status_code == 400
+    # Values that look like operators are stored as plain data
+    api.patch("/api/pages/home/sections/s1", headers=admin, json={"data": {"items": [{"$inc": 1}]}})
+    assert api.get("/api/pages/home").json()["sections"][0]["items"] == [{"$inc": 1}]
+
+
+def test_missing_section_or_item_is_404(api, admin):
+    api.patch("/api/pages/home/sections/s1", headers=admin, json={"data": {"items": [{"id": "i1"}]}})
+    assert api.patch("/api/pages/home/sections/s2/items/i1", headers=admin, json={"value": {"name": "x"}}).status_code == 404
+    assert api.patch("/api/pages/home/sections/s1/items/i9", headers=admin, json={"value": {"name": "x"}}).status_code == 404
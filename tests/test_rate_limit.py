@@ -0,0 +1,50 @@
+import time
+
+import server
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_refills_at_its_rate(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    limiter = server.TokenBucketLimiter({"login": server.parse_rate("2/10")})
+    assert limiter.acquire("login", "1.2.3.4") == 0
+    assert limiter.acquire("login", "1.2.3.4") == 0
+    assert limiter.acquire("login", "1.2.3.4") == 5.0
+    # Other clients and routes have their own buckets
+    assert limiter.acquire("login", "5.6.7.8") == 0
+    clock.now += 5
+    assert limiter.acquire("login", "1.2.3.4") == 0
+    assert limiter.acquire("login", "1.2.3.4") > 0
+
+
+def test_full_table_evicts_least_recently_used(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    limiter = server.TokenBucketLimiter({"login": server.parse_rate("1/60")})
+    limiter.max_buckets = 3
+    for ip in ("a", "b", "c"):
+        limiter.acquire("login", ip)
+    # "a" is touched again, so "b" is now the least recently used
+    assert limiter.acquire("login", "a") > 0
+    limiter.acquire("login", "d")
+    assert list(limiter.buckets) == [("c", "login"), ("a", "login"), ("d", "login")]
+    assert limiter.acquire("login", "a") > 0
+
+
+def test_login_over_budget_gets_429_with_retry_after(api):
+    credentials = {"username": "nobody", "password": "x", "secretCode": "wrong"}
+    burst = server.RATE_LIMITS["login"][1]
+    statuses = [api.post("/api/auth/login", json=credentials).status_code for _ in range(burst)]
+    assert statuses == [403] * burst
+    response = api.post("/api/auth/login", json=credentials)
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 60
+    assert server.limiter_stats["rate_limited"]["login"] >= 1
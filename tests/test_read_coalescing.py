@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def find_one_calls(api, monkeypatch):
+    calls = []
+    collection = server.public_db.articles
+    find_one = collection.find_one
+
+    async def counted(*args, **kwargs):
+        calls.append(args)
+        # Give the other callers time to arrive while the query is in flight
+        await asyncio.sleep(0.01)
+        return await find_one(*args, **kwargs)
+
+    monkeypatch.setattr(collection, "find_one", counted)
+    monkeypatch.setattr(server.single_flight, "stats", {})
+    return calls
+
+
+def test_concurrent_reads_share_one_query(api, admin, find_one_calls):
+    api.post("/api/articles", headers=admin, json={"title": "A", "slug": "a"})
+
+    async def burst(count):
+        return await asyncio.gather(*(server.get_article("a", server.public_db) for _ in range(count)))
+
+    articles = api.portal.call(burst, 10)
+    assert len(find_one_calls) == 1
+    assert server.single_flight.stats["get_article"] == {"queries": 1, "collapsed": 9}
+    assert all(article is articles[0] for article in articles)
+    # Each request still counts as a view
+    assert server.view_counter.counts[("articles", articles[0]["id"])] == 10
+
+    # Nothing is cached once the query has finished
+    api.portal.call(burst, 1)
+    assert len(find_one_calls) == 2
+    assert not server.single_flight.inflight
+
+
+def test_different_keys_do_not_share(api, admin, find_one_calls):
+    for slug in ("a", "b"):
+        api.post("/api/articles", headers=admin, json={"title": slug, "slug": slug})
+
+    async def burst():
+        return await asyncio.gather(*(server.get_article(slug, server.public_db) for slug in ("a", "b", "a", "b")))
+
+    articles = api.portal.call(burst)
+    assert [article["slug"] for article in articles] == ["a", "b", "a", "b"]
+    assert len(find_one_calls) == 2
+    assert server.single_flight.stats["get_article"] == {"queries": 2, "collapsed": 2}
+
+
+def test_cancelled_leader_does_not_cancel_followers(api, admin, find_one_calls):
+    api.post("/api/articles", headers=admin, json={"title": "A", "slug": "a"})
+
+    async def scenario():
+        leader = asyncio.ensure_future(server.get_article("a", server.public_db))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(server.get_article("a", server.public_db))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert api.portal.call(scenario)["slug"] == "a"
+    assert len(find_one_calls) == 1
+
+
+def test_missing_article_is_404_for_every_caller(api, find_one_calls):
+    async def burst():
+        return await asyncio.gather(*(server.get_article("none", server.public_db) for _ in range(3)), return_exceptions=True)
+
+    results = api.portal.call(burst)
+    assert [r.status_code for r in results] == [404, 404, 404]
+    assert len(find_one_calls) == 1
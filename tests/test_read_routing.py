@@ -0,0 +1,27 @@
+import pytest
+
+import server
+from memory_engine import MemoryClient
+
+
+@pytest.fixture
+def lagging(api, monkeypatch):
+    """public_db as a secondary that has not caught up with any write yet"""
+    monkeypatch.setattr(server, "public_db", MemoryClient()["lagging"])
+
+
+def test_admin_reads_see_their_own_writes(api, admin, lagging):
+    article = {"title": "Baru", "slug": "baru"}
+    assert api.post("/api/articles", headers=admin, json=article).status_code == 200
+
+    assert [a["slug"] for a in api.get("/api/articles", headers=admin).json()] == ["baru"]
+    assert api.get("/api/articles/baru", headers=admin).status_code == 200
+    # Anonymous traffic keeps reading the secondary
+    assert api.get("/api/articles").json() == []
+    assert api.get("/api/articles/baru").status_code == 404
+
+
+def test_invalid_token_reads_public_db(api, admin, lagging):
+    api.post("/api/media", headers=admin, json={"title": "Foto", "type": "image", "url": "/x.png"})
+    assert api.get("/api/media", headers={"Authorization": "Bearer not-a-token"}).json() == []
+    assert len(api.get("/api/media", headers=admin).json()) == 1
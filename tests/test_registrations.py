@@ -0,0 +1,111 @@
+import asyncio
+
+import server
+
+
+def registration(event_id, email):
+    return {"eventId": event_id, "fullName": "Test", "email": email, "phone": "0812"}
+
+
+def create_event(api, admin):
+    response = api.post("/api/events", headers=admin, json={"title": "Kajian", "slug": "kajian", "date": "2030-01-10", "time": "19:00"})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_registration_dedupes_by_event_and_email(api, admin):
+    event_id = create_event(api, admin)
+    first = api.post(f"/api/events/{event_id}/register", json=registration(event_id, "a@x.id"))
+    repeat = api.post(f"/api/events/{event_id}/register", json=registration(event_id, " A@X.id "))
+    other = api.post(f"/api/events/{event_id}/register", json=registration(event_id, "b@x.id"))
+    assert first.status_code == repeat.status_code == other.status_code == 200
+    assert first.json()["registrationId"] == repeat.json()["registrationId"] != other.json()["registrationId"]
+    registrations = api.get(f"/api/events/{event_id}/registrations", headers=admin).json()
+    assert sorted(r["email"] for r in registrations) == ["a@x.id", "b@x.id"]
+
+
+def test_idempotency_key_replays_the_first_result(api, admin):
+    event_id = create_event(api, admin)
+    headers = {"Idempotency-Key": "retry-1"}
+    first = api.post(f"/api/events/{event_id}/register", json=registration(event_id, "a@x.id"), headers=headers)
+    server.idempotency_cache.pop(f"{event_id}:email:a@x.id")
+    # Same key, even with an edited address: still the first attempt
+    retry = api.post(f"/api/events/{event_id}/register", json=registration(event_id, "typo@x.id"), headers=headers)
+    assert retry.json() == first.json()
+    assert len(api.get(f"/api/events/{event_id}/registrations", headers=admin).json()) == 1
+
+
+def test_concurrent_registrations_share_one_row(api, admin):
+    event_id = create_event(api, admin)
+    data = server.EventRegistrationCreate(**registration(event_id, "c@x.id"))
+
+    async def burst():
+        return await asyncio.gather(*(server.register_event(event_id, data, None) for _ in range(20)))
+
+    # Drive the handler directly on the app's loop, the way simultaneous requests would interleave
+    results = api.portal.call(burst)
+    assert len({result["registrationId"] for result in results}) == 1
+    assert len(api.get(f"/api/events/{event_id}/registrations", headers=admin).json()) == 1
+
+
+def test_waiting_retry_takes_over_a_cancelled_attempt(api, admin, monkeypatch):
+    event_id = create_event(api, admin)
+    data = server.EventRegistrationCreate(**registration(event_id, "d@x.id"))
+    save = server.save_registration
+    calls = []
+
+    async def save_registration(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            # The first client disconnects while its write is still pending
+            await asyncio.Event().wait()
+        return await save(*args)
+
+    monkeypatch.setattr(server, "save_registration", save_registration)
+
+    async def scenario():
+        first = asyncio.ensure_future(server.register_event(event_id, data, None))
+        await asyncio.sleep(0)
+        retry = asyncio.ensure_future(server.register_event(event_id, data, None))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await retry
+
+    result = api.portal.call(scenario)
+    assert len(calls) == 2
+    assert result["success"]
+    assert len(api.get(f"/api/events/{event_id}/registrations", headers=admin).json()) == 1
+
+
+def test_dedupe_registrations_keeps_earliest(api):
+    async def scenario():
+        await server.db.registrations.drop_index("event_email_unique")
+        await server.db.registrations.insert_many([
+            {"id": "late", "eventId": "e", "email": "A@x.id ", "createdAt": 2},
+            {"id": "early", "eventId": "e", "email": "a@x.id", "createdAt": 1},
+        ])
+        result = await server.dedupe_registrations()
+        await server.ensure_indexes()
+        kept = await server.db.registrations.find({}, {"_id": 0, "id": 1}).to_list(None)
+        moved = await server.db.registration_duplicates.count_documents({})
+        return result, kept, moved
+
+    result, kept, moved = api.portal.call(scenario)
+    assert result == {"normalized": 1, "removed": 1}
+    assert kept == [{"id": "early"}]
+    assert moved == 1
+
+
+def test_startup_refuses_without_the_unique_index(api):
+    async def scenario():
+        await server.db.registrations.drop_index("event_email_unique")
+        await server.db.registrations.insert_many([
+            {"id": "1", "eventId": "e", "email": "a@x.id"},
+            {"id": "2", "eventId": "e", "email": "a@x.id"},
+        ])
+        try:
+            await server.ensure_indexes()
+        except RuntimeError as e:
+            return str(e)
+
+    assert "dedupe_registrations.py" in api.portal.call(scenario)
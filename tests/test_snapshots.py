@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def snapshots(api, tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "SNAPSHOT_DIR", str(tmp_path))
+    return tmp_path
+
+
+def read(directory, *parts):
+    return json.loads(directory.joinpath(*parts[:-1], parts[-1] + ".json").read_text())
+
+
+def create_document(api, admin, slug, doc_type):
+    response = api.post("/api/documents", headers=admin, json={"title": slug, "slug": slug, "docType": doc_type})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_admin_writes_refresh_list_and_item_files(api, admin, snapshots):
+    response = api.post("/api/articles", headers=admin, json={"title": "A", "slug": "a", "tags": ["kajian"]})
+    article_id = response.json()["id"]
+    assert [a["slug"] for a in read(snapshots, "articles")] == ["a"]
+    assert read(snapshots, "articles", "a")["title"] == "A"
+    assert read(snapshots, "tags") == [{"tag": "kajian", "count": 1}]
+
+    api.put(f"/api/articles/{article_id}", headers=admin, json={"title": "B", "slug": "b"})
+    assert not (snapshots / "articles" / "a.json").exists()
+    assert read(snapshots, "articles", "b")["title"] == "B"
+    api.delete(f"/api/articles/{article_id}", headers=admin)
+    assert read(snapshots, "articles") == []
+    assert not (snapshots / "articles" / "b.json").exists()
+
+
+def test_document_type_lists_are_queried_per_type(api, admin, snapshots, monkeypatch):
+    monkeypatch.setitem(server.SNAPSHOT_COLLECTIONS, "documents", ("slug", ("createdAt", -1), 2))
+    for slug in ("r1", "r2"):
+        create_document(api, admin, slug, "report")
+    for slug in ("a1", "a2"):
+        create_document(api, admin, slug, "activity")
+    # The overall list is full of newer activities, the report list still has both reports
+    assert [d["slug"] for d in read(snapshots, "documents")] == ["a2", "a1"]
+    assert [d["slug"] for d in read(snapshots, "documents", "type", "report")] == ["r2", "r1"]
+    assert read(snapshots, "documents", "type", "report") == api.get("/api/documents?doc_type=report").json()
+
+
+def test_full_export_prunes_deleted_items(api, admin, snapshots):
+    create_document(api, admin, "kept", "report")
+    (snapshots / "documents" / "gone.json").write_text("{}")
+    files = api.portal.call(server.export_all_snapshots)
+    assert not (snapshots / "documents" / "gone.json").exists()
+    assert (snapshots / "documents" / "kept.json").exists()
+    assert read(snapshots, "settings", "logo") == {"logoUrl": ""}
+    assert files >= len(server.SNAPSHOT_COLLECTIONS) + 2
+
+
+def test_item_keys_cannot_escape_the_directory(snapshots):
+    assert server.snapshot_path("articles", "..") is None
+    assert server.snapshot_path("articles", "a/b") is None
+    assert server.snapshot_path("articles", "") is None
+
+
+def test_concurrent_writes_of_one_file(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    path = tmp_path / "articles.json"
+    bodies = [json.dumps([i] * 1000) for i in range(50)]
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda body: server.write_snapshot(path, body), bodies))
+    assert path.read_text() in bodies
+    assert list(tmp_path.iterdir()) == [path]
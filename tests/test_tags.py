@@ -0,0 +1,36 @@
+import server
+
+
+def create_article(api, admin, slug, tags):
+    response = api.post("/api/articles", headers=admin, json={"title": slug, "slug": slug, "tags": tags})
+    return response.json()["id"]
+
+
+def test_tag_counts_follow_article_writes(api, admin):
+    first = create_article(api, admin, "a", ["kajian", "remaja"])
+    create_article(api, admin, "b", ["kajian"])
+    assert api.get("/api/tags").json() == [{"tag": "kajian", "count": 2}, {"tag": "remaja", "count": 1}]
+
+    api.put(f"/api/articles/{first}", headers=admin, json={"title": "a", "slug": "a", "tags": ["sosial"]})
+    assert api.get("/api/tags").json() == [{"tag": "kajian", "count": 1}, {"tag": "sosial", "count": 1}]
+    api.delete(f"/api/articles/{first}", headers=admin)
+    assert api.get("/api/tags").json() == [{"tag": "kajian", "count": 1}]
+
+
+def test_other_workers_read_the_stored_counts(api, admin, monkeypatch):
+    create_article(api, admin, "a", ["kajian"])
+    api.get("/api/tags")
+    aggregations = []
+    monkeypatch.setattr(server, "refresh_tag_counts", lambda: aggregations.append(1))
+    # A worker with an empty cache takes the counts the writing worker stored
+    server.tag_cache.update(expires=0.0, tags=None)
+    assert api.get("/api/tags").json() == [{"tag": "kajian", "count": 1}]
+    assert aggregations == []
+
+
+def test_tag_filter_lists_newest_first(api, admin):
+    for slug, tags in (("old", ["kajian"]), ("other", ["sosial"]), ("new", ["kajian", "sosial"])):
+        create_article(api, admin, slug, tags)
+    assert [a["slug"] for a in api.get("/api/articles?tag=kajian").json()] == ["new", "old"]
+    assert [a["slug"] for a in api.get("/api/articles?tag=kajian&skip=1&limit=1").json()] == ["old"]
+    assert api.get("/api/articles?tag=none").json() == []
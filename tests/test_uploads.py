@@ -0,0 +1,110 @@
+import os
+import time
+import uuid
+from urllib.parse import quote
+
+import pytest
+
+import server
+
+
+def test_storage_backends_must_implement_every_operation():
+    with pytest.raises(TypeError):
+        server.UploadStorage()
+
+    class Partial(server.UploadStorage):
+        async def save(self, filename, file):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_upload_round_trip_and_hidden_names(api, admin):
+    uploaded = api.post("/api/upload", headers=admin, files={"file": ("logo.png", b"png-bytes", "image/png")}).json()
+    assert uploaded["filename"].endswith(".png")
+    assert api.get(uploaded["url"]).content == b"png-bytes"
+    assert api.get("/api/uploads/missing.png").status_code == 404
+    (server.UPLOAD_DIR / server.QUARANTINE_DIR).mkdir()
+    assert api.get(f"/api/uploads/{server.QUARANTINE_DIR}").status_code == 404
+
+
+def test_stored_extensions_are_restricted():
+    for original, ext in (("a.PNG", ".PNG"), ("x.tar.gz", ".gz"), ("photo.my pic", ""), ("noext", ""),
+                          ("a.verylongext", ""), ("a.", ""), ("../../x.png/..", "")):
+        name = server.new_upload_filename(original)
+        assert name[36:] == ext
+        assert server.UPLOAD_ID_PATTERN.fullmatch(name[:36])
+
+
+def test_references_match_encoded_and_mangled_names():
+    names = set()
+    file_id = "0f8fad5b-d9cb-469f-a165-70867728950e"
+    server.collect_upload_names({"sections": [{"html": f'<img src="/api/uploads/{file_id}.my%20pic">'}]}, names)
+    server.collect_upload_names(["![x](/api/uploads/legacy%20name.png)", "/uploads/"], names)
+    assert names == {file_id, "legacy name.png"}
+
+
+DAY = 86400
+
+
+def store(name, age_days, quarantined=False):
+    directory = server.UPLOAD_DIR / server.QUARANTINE_DIR if quarantined else server.UPLOAD_DIR
+    directory.mkdir(exist_ok=True)
+    path = directory / name
+    path.write_bytes(b"x" * 10)
+    modified = time.time() - age_days * DAY
+    os.utime(path, (modified, modified))
+    return path
+
+
+def test_collector_keeps_referenced_and_recent_files(api, admin, monkeypatch):
+    monkeypatch.setattr(server, "UPLOAD_GC_GRACE_HOURS", 24)
+    referenced = str(uuid.uuid4()) + ".my pic"
+    store(referenced, 10)
+    recent = store(str(uuid.uuid4()) + ".png", 0.5)
+    orphan = store(str(uuid.uuid4()) + ".png", 2)
+    api.post("/api/media", headers=admin, json={"title": "Foto", "type": "image", "url": f"/api/uploads/{quote(referenced)}"})
+
+    usage = api.get("/api/admin/uploads", headers=admin).json()["current"]
+    assert (usage["files"], usage["referencedFiles"], usage["recentFiles"], usage["orphanedFiles"]) == (3, 1, 1, 1)
+    assert usage["reclaimableBytes"] == 10
+    # Report mode touches nothing
+    assert orphan.exists()
+
+    report = api.post("/api/admin/uploads/gc?mode=quarantine", headers=admin).json()
+    assert report["removedFiles"] == 1 and report["quarantinedFiles"] == 1
+    assert not orphan.exists()
+    assert (server.UPLOAD_DIR / server.QUARANTINE_DIR / orphan.name).exists()
+    assert (server.UPLOAD_DIR / referenced).exists() and recent.exists()
+    assert api.get(f"/api/uploads/{orphan.name}").status_code == 404
+
+
+def test_quarantined_file_is_restored_when_referenced_again(api, admin):
+    name = str(uuid.uuid4()) + ".jpg"
+    store(name, 5, quarantined=True)
+    api.post("/api/articles", headers=admin, json={"title": "A", "slug": "a", "content": f"<img src='/api/uploads/{name}'>"})
+    report = api.portal.call(server.collect_uploads, "quarantine")
+    assert report["restoredFiles"] == 1
+    assert api.get(f"/api/uploads/{name}").status_code == 200
+
+
+def test_quarantine_is_purged_after_retention(api, monkeypatch):
+    monkeypatch.setattr(server, "UPLOAD_GC_QUARANTINE_DAYS", 30)
+    expired = store(str(uuid.uuid4()) + ".png", 31, quarantined=True)
+    kept = store(str(uuid.uuid4()) + ".png", 29, quarantined=True)
+    report = api.portal.call(server.collect_uploads, "quarantine")
+    assert (report["purgedFiles"], report["quarantinedFiles"]) == (1, 1)
+    assert not expired.exists() and kept.exists()
+    # Report mode never purges
+    store(expired.name, 31, quarantined=True)
+    assert api.portal.call(server.collect_uploads, "report")["purgedFiles"] == 0
+    assert expired.exists()
+
+
+def test_delete_mode_removes_orphans(api):
+    orphan = store(str(uuid.uuid4()) + ".png", 2)
+    report = api.portal.call(server.collect_uploads, "delete")
+    assert report["removedFiles"] == 1 and report["reclaimableBytes"] == 0
+    assert not orphan.exists()
+    assert not (server.UPLOAD_DIR / server.QUARANTINE_DIR).exists()
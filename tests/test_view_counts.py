@@ -0,0 +1,49 @@
+import server
+
+
+def create_article(api, admin, slug):
+    return api.post("/api/articles", headers=admin, json={"title": slug, "slug": slug, "content": "long"}).json()["id"]
+
+
+def test_popular_counts_after_a_flush(api, admin):
+    for slug, views in (("a", 1), ("b", 3), ("c", 0)):
+        create_article(api, admin, slug)
+        for _ in range(views):
+            api.get(f"/api/articles/{slug}")
+    # Nothing is written until the counter flushes
+    assert api.get("/api/popular/articles").json() == []
+    server.popular_cache.clear()
+
+    api.portal.call(server.view_counter.flush)
+    popular = api.get("/api/popular/articles").json()
+    assert [(a["slug"], a["views"]) for a in popular] == [("b", 3), ("a", 1)]
+    assert "content" not in popular[0]
+
+
+def test_flushes_accumulate_into_one_counter(api, admin):
+    article_id = create_article(api, admin, "a")
+    for _ in range(2):
+        api.get("/api/articles/a")
+        api.portal.call(server.view_counter.flush)
+    counts = api.portal.call(server.db.view_counts.find({}, {"_id": 0}).to_list, None)
+    assert counts == [{"collection": "articles", "docId": article_id, "views": 2}]
+
+
+def test_failed_flush_keeps_the_increments(api, admin, monkeypatch):
+    create_article(api, admin, "a")
+    api.get("/api/articles/a")
+
+    async def unavailable(*args, **kwargs):
+        raise ConnectionError("primary stepped down")
+
+    bulk_write = server.db.view_counts.bulk_write
+    monkeypatch.setattr(server.db.view_counts, "bulk_write", unavailable)
+    api.portal.call(server.view_counter.flush)
+    assert server.view_counter.pending == 1
+    monkeypatch.setattr(server.db.view_counts, "bulk_write", bulk_write)
+    api.portal.call(server.view_counter.flush)
+    assert api.portal.call(server.db.view_counts.count_documents, {}) == 1
+
+
+def test_unknown_kind_is_404(api):
+    assert api.get("/api/popular/users").status_code == 404